@@ -0,0 +1,75 @@
+"""
+Compare the encoding of the /tasks and /tasks/board responses: the response_model's path
+(jsonable_encoder, validation and the stdlib encoder) with FastJSONResponse,
+which is measured both with orjson, if it's installed, and with the stdlib fallback.
+The rows case is the JSON of the read models, which are rendered by JSONResponse currently.
+
+    python -m benchmarks.json_encoding --tasks 2000 --repeat 20
+"""
+import argparse
+import datetime as dt
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import serialize_response
+from starlette.responses import JSONResponse
+
+from scrum.api.utils import responses
+from scrum.api.utils.responses import FastJSONResponse
+from scrum.api.v1.api import api_router
+from scrum.db_models.task_state import TaskState
+from scrum.models.tag import Tag
+from scrum.models.task import Task, TaskBoard
+from scrum.models.users import User
+
+
+def make_tasks(count: int):
+    creator = User(id=1, username='creator', full_name='Создатель задач')
+    assignee = User(id=2, username='assignee', full_name='Исполнитель')
+    tags = [Tag(id=i, name=f'тег {i}', color='#3F51B5', project_id=1) for i in range(3)]
+    states = list(TaskState)
+    return [Task(id=i, name=f'Задача {i}', description='Описание задачи ' * 20, project_id=1,
+                 priority=i % 3, weight=i % 8 + 1, created_at=dt.datetime.utcnow(), sprint_id=1,
+                 creator_id=1, assignee_id=2, state=states[i % len(states)],
+                 creator=creator, assignee=assignee, tags=tags[:i % 4])
+            for i in range(count)]
+
+
+def response_field(path: str):
+    for route in api_router.routes:
+        if route.path == path and 'GET' in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks)
+    board = TaskBoard(todo=tasks[0::4], inProcess=tasks[1::4], testing=tasks[2::4], done=tasks[3::4])
+    rows = jsonable_encoder(tasks)
+    cases = [('/tasks', tasks), ('/tasks/board', board), ('/tasks (rows)', rows)]
+    orjson = responses.orjson
+
+    def measure(run) -> float:
+        return min(timeit.repeat(run, number=1, repeat=args.repeat)) * 1000
+
+    print(f'{"endpoint":<14}{"current, ms":>13}{"stdlib, ms":>13}{"orjson, ms":>13}')
+    for path, content in cases:
+        if content is rows:
+            current = measure(lambda: JSONResponse(content))
+        else:
+            field = response_field(path)
+            current = measure(lambda: JSONResponse(serialize_response(field=field, response=content)))
+        responses.orjson = None
+        stdlib = measure(lambda: FastJSONResponse(content))
+        responses.orjson = orjson
+        fast = f'{measure(lambda: FastJSONResponse(content)):>13.2f}' if orjson is not None else f'{"-":>13}'
+        print(f'{path:<14}{current:>13.2f}{stdlib:>13.2f}{fast}')
+
+
+if __name__ == '__main__':
+    main()
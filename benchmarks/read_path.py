@@ -0,0 +1,122 @@
+"""
+Compare the ORM read path of the list endpoints with the Core one on an in-memory SQLite database.
+The ORM path is the repository's query, the *_response helpers and the response_model's
+validation, the Core path is the row repository and to_json(), both render the JSON body.
+
+    python -m benchmarks.read_path --tasks 2000 --repeat 20
+"""
+import argparse
+import datetime as dt
+import timeit
+
+from fastapi.routing import serialize_response
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.responses import JSONResponse
+
+from scrum.api.utils.projects import project_response
+from scrum.api.utils.rows import rows_response
+from scrum.api.utils.tasks import tasks_response
+from scrum.api.v1.api import api_router
+from scrum.db.base import Base
+from scrum.db_models.project import Project
+from scrum.db_models.sprint import Sprint
+from scrum.db_models.tag import Tag
+from scrum.db_models.task import Task
+from scrum.db_models.user import User
+from scrum.models.rows import TagRow
+from scrum.models.task import TaskCreate
+from scrum.repositories.projects import ProjectRepository, ProjectRowRepository
+from scrum.repositories.sprints import SprintRepository, SprintRowRepository
+from scrum.repositories.tags import TagRepository, tag_columns
+from scrum.repositories.tasks import TaskRepository, TaskRowRepository
+
+PROJECTS = 10
+TAGS_PER_PROJECT = 5
+
+
+def seed(session, tasks: int) -> None:
+    with session.begin():
+        users = [User(username=f'user{i}', hashed_password='-') for i in range(10)]
+        session.add_all(users)
+        session.flush()
+        projects = [Project(users[0].id, name=f'project{i}', sprint_length=2) for i in range(PROJECTS)]
+        session.add_all(projects)
+        session.flush()
+        start = dt.date.today()
+        for project in projects:
+            project.tags = [Tag(name=f'tag{i}', color='#fff') for i in range(TAGS_PER_PROJECT)]
+            project.sprints = [Sprint(length=2, start_date=start + dt.timedelta(weeks=2 * i))
+                               for i in range(5)]
+        session.flush()
+        for i in range(tasks):
+            project = projects[i % PROJECTS]
+            task = Task(TaskCreate(name=f'task{i}', description='x' * 500, project_id=project.id,
+                                   priority=0, weight=i % 8 + 1), users[i % 10].id)
+            task.assignee_id = users[(i + 1) % 10].id
+            task.tags = project.tags[:i % TAGS_PER_PROJECT]
+            session.add(task)
+
+
+def response_field(path: str):
+    for route in api_router.routes:
+        if route.path == path and 'GET' in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(autocommit=True, autoflush=False, bind=engine)
+    seed(session_factory(), args.tasks)
+    project_ids = list(range(1, PROJECTS + 1))
+    tags = Tag.__table__
+
+    def orm(fetch, serialize, path):
+        def run():
+            session = session_factory()
+            JSONResponse(serialize_response(field=response_field(path),
+                                            response=serialize(fetch(session))))
+            session.close()
+        return run
+
+    def core(fetch):
+        def run():
+            session = session_factory()
+            rows_response(fetch(session))
+            session.close()
+        return run
+
+    cases = [
+        ('tasks',
+         orm(lambda s: TaskRepository(s).fetch_all(), tasks_response, '/tasks'),
+         core(lambda s: TaskRowRepository(s).fetch_all())),
+        ('sprints',
+         orm(lambda s: SprintRepository(s).fetch_all(project_ids, None), list, '/sprints'),
+         core(lambda s: SprintRowRepository(s).fetch_all(project_ids))),
+        ('projects',
+         orm(lambda s: ProjectRepository(s).fetch_all([], True),
+             lambda projects: [project_response(project) for project in projects], '/projects'),
+         core(lambda s: ProjectRowRepository(s).fetch_all())),
+        # the endpoint reads tags with the async repository, its query is run synchronously here
+        ('tags',
+         orm(lambda s: TagRepository(s).fetch_accessible(project_ids), list, '/tags'),
+         core(lambda s: [TagRow(*row) for row in
+                         s.execute(select(tag_columns).where(tags.c.project_id.in_(project_ids)))])),
+    ]
+    print(f'{"endpoint":<10}{"orm, ms":>10}{"core, ms":>10}{"speedup":>10}')
+    for name, orm_path, core_path in cases:
+        orm_time = min(timeit.repeat(orm_path, number=1, repeat=args.repeat)) * 1000
+        core_time = min(timeit.repeat(core_path, number=1, repeat=args.repeat)) * 1000
+        print(f'{name:<10}{orm_time:>10.2f}{core_time:>10.2f}{orm_time / core_time:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
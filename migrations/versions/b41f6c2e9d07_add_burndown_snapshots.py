@@ -0,0 +1,32 @@
+"""add burndown snapshots
+
+Revision ID: b41f6c2e9d07
+Revises: e3c0abbbf3ef
+Create Date: 2026-10-18 12:04:51.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41f6c2e9d07'
+down_revision = 'e3c0abbbf3ef'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('sprints', sa.Column('total_weight', sa.Integer(), nullable=True))
+    op.create_table('burndown_snapshots',
+    sa.Column('sprint_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('done_weight', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['sprint_id'], ['sprints.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sprint_id', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('burndown_snapshots')
+    op.drop_column('sprints', 'total_weight')
@@ -0,0 +1,26 @@
+"""add version counters
+
+Revision ID: c5e82d1f4a36
+Revises: b41f6c2e9d07
+Create Date: 2026-10-18 17:31:08.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e82d1f4a36'
+down_revision = 'b41f6c2e9d07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('projects', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('sprints', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    op.drop_column('sprints', 'version')
+    op.drop_column('projects', 'version')
@@ -0,0 +1,28 @@
+"""exclude intersecting sprints
+
+Revision ID: d93f1b7a0c52
+Revises: c5e82d1f4a36
+Create Date: 2026-10-18 17:52:19.716530
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd93f1b7a0c52'
+down_revision = 'c5e82d1f4a36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # btree_gist provides the gist operator class for the equality on project_id
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute(
+        'ALTER TABLE sprints ADD CONSTRAINT sprints_dates_excl EXCLUDE USING gist '
+        "(project_id WITH =, daterange(start_date, end_date, '[]') WITH &&)"
+    )
+
+
+def downgrade():
+    op.drop_constraint('sprints_dates_excl', 'sprints')
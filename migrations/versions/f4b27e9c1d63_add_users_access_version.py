@@ -0,0 +1,24 @@
+"""add users access version
+
+Revision ID: f4b27e9c1d63
+Revises: d93f1b7a0c52
+Create Date: 2026-10-18 19:02:41.517390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b27e9c1d63'
+down_revision = 'd93f1b7a0c52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('access_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'access_version')
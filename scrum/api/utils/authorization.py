@@ -0,0 +1,84 @@
+from typing import Dict, List, Optional
+
+from databases import Database
+from sqlalchemy.orm import Session
+
+from scrum.db_models.accessible_project import Roles
+from scrum.models.token import TokenPayload
+from scrum.repositories.accessible_project import AccessibleProjectRepository, AsyncAccessibleProjectRepository
+
+AUTHORIZATION_KEY = 'project_authorization'
+
+
+class ProjectAuthorization(object):
+    """
+    User's roles in projects, loaded once and answering access checks without the database
+    """
+
+    def __init__(self, user_id: int, roles: Dict[int, Roles]):
+        self.user_id = user_id
+        self.roles = roles
+
+    @property
+    def project_ids(self) -> List[int]:
+        return list(self.roles.keys())
+
+    @property
+    def owned_project_ids(self) -> List[int]:
+        return [project_id for project_id, role in self.roles.items() if role == Roles.owner]
+
+    def role(self, project_id: int) -> Optional[Roles]:
+        return self.roles.get(project_id)
+
+    def has_access(self, project_id: int) -> bool:
+        return project_id in self.roles
+
+    def is_owner(self, project_id: int) -> bool:
+        return self.roles.get(project_id) == Roles.owner
+
+
+def get_project_authorization(db_session: Session, user_id: int) -> ProjectAuthorization:
+    """
+    Get user's authorization for the current request. A session lives exactly as long as
+    a request, so the roles are kept in its info dict and loaded only on the first call
+    :param db_session: request's db session
+    :param user_id: user's id
+    """
+    authorizations = db_session.info.setdefault(AUTHORIZATION_KEY, {})
+    authorization = authorizations.get(user_id)
+    if authorization is None:
+        accessible_repo = AccessibleProjectRepository(db_session)
+        authorization = ProjectAuthorization(user_id, accessible_repo.fetch_roles_for_user(user_id))
+        authorizations[user_id] = authorization
+    return authorization
+
+
+def seed_project_authorization(db_session: Session, token_data: TokenPayload) -> None:
+    """
+    Use the roles carried by a token, which isn't stale, for the current request
+    """
+    roles = {project_id: Roles(role)
+             for role, project_ids in token_data.roles.items() for project_id in project_ids}
+    authorizations = db_session.info.setdefault(AUTHORIZATION_KEY, {})
+    authorizations[token_data.user_id] = ProjectAuthorization(token_data.user_id, roles)
+
+
+async def get_project_authorization_async(database: Database, user_id: int) -> ProjectAuthorization:
+    """
+    Get user's authorization using the async database layer
+    """
+    accessible_repo = AsyncAccessibleProjectRepository(database)
+    return ProjectAuthorization(user_id, await accessible_repo.fetch_roles_for_user(user_id))
+
+
+def reset_project_authorization(db_session: Session, user_id: int = None) -> None:
+    """
+    Forget loaded roles, so the next check reloads them after the membership changes
+    """
+    authorizations = db_session.info.get(AUTHORIZATION_KEY)
+    if authorizations is None:
+        return
+    if user_id is None:
+        authorizations.clear()
+    else:
+        authorizations.pop(user_id, None)
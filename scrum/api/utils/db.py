@@ -1,7 +1,57 @@
+import logging
+import time
+
+from databases import Database
+from sqlalchemy import exc
 from sqlalchemy.orm import Session
 from starlette.requests import Request
 
+from scrum.core import config
+from scrum.db.async_session import database
+from scrum.db.session import Session as SessionFactory
+from scrum.db.unit_of_work import begin_unit_of_work, is_read_only
+
+logger = logging.getLogger(__name__)
+
 
 def get_db(request: Request) -> Session:
-    return request.state.session
+    """
+    Get request's session, the session is opened on the first call.
+    With UNIT_OF_WORK it's opened with the request's transaction, which is read-only for GET requests
+    """
+    session = getattr(request.state, 'session', None)
+    if session is None:
+        session = SessionFactory()
+        request.state.session = session
+        request.state.session_opened_at = time.monotonic()
+        if config.UNIT_OF_WORK:
+            begin_unit_of_work(session, read_only=request.method in ('GET', 'HEAD'))
+    return session
+
+
+def release_db(request: Request, commit: bool = False) -> None:
+    """
+    Close request's session if it was opened, warning about sessions held for too long
+    :param commit: commit the request's unit of work, it's rolled back otherwise
+    """
+    session = getattr(request.state, 'session', None)
+    if session is None:
+        return
+    request.state.session = None
+    held = time.monotonic() - request.state.session_opened_at
+    if held > config.SESSION_LEAK_THRESHOLD:
+        logger.warning('Session for %s %s was held for %.2fs',
+                       request.method, request.url.path, held)
+    try:
+        transaction = session.transaction
+        if commit and transaction is not None and transaction.is_active and not is_read_only(session):
+            session.commit()
+    except exc.SQLAlchemyError as e:
+        logger.error(e)
+        raise
+    finally:
+        session.close()
+
 
+def get_async_db() -> Database:
+    return database
@@ -0,0 +1,37 @@
+import hashlib
+from typing import Any, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+
+def make_etag(request: Request, *versions: Any) -> str:
+    """
+    Weak ETag of a read endpoint's response, derived from the versions of the read data
+    and the request's query. Versions must be read before the response's data,
+    so a concurrent write can't be hidden behind an old ETag
+    """
+    key = repr((request.url.path, str(request.query_params), versions)).encode()
+    return f'W/"{hashlib.sha1(key).hexdigest()}"'
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """
+    :return: a 304 response if the request's If-None-Match matches the ETag, None otherwise
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is None:
+        return None
+    client_etags = {_opaque_tag(client_etag) for client_etag in if_none_match.split(',')}
+    if '*' in client_etags or _opaque_tag(etag) in client_etags:
+        return Response(status_code=HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return None
+
+
+def _opaque_tag(etag: str) -> str:
+    """
+    ETags are compared weakly, so the weakness indicator is dropped
+    """
+    etag = etag.strip()
+    return etag[2:] if etag.startswith('W/') else etag
@@ -0,0 +1,37 @@
+from typing import Any, Optional, Set, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from starlette.status import HTTP_400_BAD_REQUEST
+
+from scrum.api.utils.responses import FastJSONResponse
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[Set[str]]:
+    """
+    Translate the comma separated list of response's fields to the model's field names,
+    fields can be named by their aliases or by their names. Id is always included
+    :return: names of the requested fields, None if the fieldset isn't requested
+    """
+    if fields is None:
+        return None
+    names = {}
+    for name, field in model.__fields__.items():
+        names[name] = name
+        names[field.alias] = name
+    requested = {field.strip() for field in fields.split(',') if field.strip()}
+    unknown = sorted(field for field in requested if field not in names)
+    if unknown:
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=f'Неизвестные поля: {", ".join(unknown)}'
+        )
+    return {names[field] for field in requested} | {'id'}
+
+
+def fields_response(content: Any) -> FastJSONResponse:
+    """
+    Serialize models built for a sparse fieldset, they lack required fields,
+    so they can't be validated by the response_model
+    """
+    return FastJSONResponse(content=content)
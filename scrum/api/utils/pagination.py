@@ -0,0 +1,72 @@
+import base64
+import binascii
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.status import HTTP_400_BAD_REQUEST
+
+from scrum.api.utils.responses import FastJSONResponse
+from scrum.core import config
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+invalid_page = HTTPException(
+    status_code=HTTP_400_BAD_REQUEST,
+    detail='Неверные параметры страницы'
+)
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise invalid_page
+
+
+def page_params(limit: Optional[int], cursor: Optional[str],
+                whole_table: bool = False) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Validate page's query parameters
+    :param whole_table: the list isn't limited to user's projects, such a list is paginated
+    with DEFAULT_PAGE_SIZE even if pagination isn't requested
+    :return: page's size and the id to start after, both are None if pagination isn't requested
+    """
+    if limit is None and cursor is None and not whole_table:
+        return None, None
+    if limit is None:
+        limit = config.DEFAULT_PAGE_SIZE
+    if limit <= 0:
+        raise invalid_page
+    limit = min(limit, config.MAX_PAGE_SIZE)
+    return limit, decode_cursor(cursor) if cursor is not None else None
+
+
+def page_response(items: List[Any], model: Type[BaseModel], limit: int,
+                  fields: Set[str] = None) -> FastJSONResponse:
+    """
+    Serialize a page like the response_model would, the cursor of the next page
+    is sent in the X-Next-Cursor header when the page is full
+    :param fields: sparse fieldset, the items are models built for it and aren't validated
+    """
+    if fields is not None:
+        content = items
+    else:
+        content = [model(**jsonable_encoder(item)) for item in items]
+    return FastJSONResponse(content=content, headers=next_page_headers(items, limit))
+
+
+def next_page_headers(items: List[Any], limit: Optional[int]) -> Dict[str, str]:
+    """
+    Headers with the cursor of the next page, which is sent only when the page is full
+    """
+    if not items or len(items) != limit:
+        return {}
+    last = items[-1]
+    last_id = last['id'] if isinstance(last, dict) else last.id
+    return {NEXT_CURSOR_HEADER: encode_cursor(last_id)}
@@ -1,25 +1,32 @@
+from typing import Set
+
 from sqlalchemy.orm import Session
 
+from scrum.api.utils.authorization import get_project_authorization
 from scrum.db_models.project import Project as DBProject
 from scrum.models.project import Project
 from scrum.models.tag import Tag
-from scrum.repositories.accessible_project import AccessibleProjectRepository
 
 
 def has_access_to_project(db_session: Session, user_id: int, project_id: int) -> bool:
-    accessible_repo = AccessibleProjectRepository(db_session)
-    accessible_projects = accessible_repo.fetch_accessible_for_user(user_id)
-    return project_id in accessible_projects
+    return get_project_authorization(db_session, user_id).has_access(project_id)
 
 
 def is_project_owner(db_session: Session, user_id: int, project_id: int) -> bool:
-    accessible_repo = AccessibleProjectRepository(db_session)
-    accessible_projects = accessible_repo.fetch_accessible_for_user(user_id, only_owner=True)
-    return project_id in accessible_projects
+    return get_project_authorization(db_session, user_id).is_owner(project_id)
 
 
-def project_response(project: DBProject) -> Project:
-    project_dict = project.__dict__
+def project_response(project: DBProject, fields: Set[str] = None) -> Project:
+    """
+    :param fields: sparse fieldset, only these fields are read from the project
+    and set in the response, the response isn't validated then
+    """
+    if fields is not None:
+        values = {name: getattr(project, name) for name in fields - {'tags'}}
+        if 'tags' in fields:
+            values['tags'] = [Tag(**tag.__dict__) for tag in project.tags]
+        return Project.construct(values, set(values))
+    project_dict = dict(project.__dict__)
     tags = [Tag(**tag.__dict__) for tag in project.tags]
-    del project_dict['tags']
+    project_dict.pop('tags', None)
     return Project(tags=tags, **project_dict)
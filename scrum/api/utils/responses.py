@@ -0,0 +1,43 @@
+import datetime as dt
+import enum
+import json
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is pinned in requirements.txt, the stdlib encoder is a fallback for development
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.dict(by_alias=True)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (dt.date, dt.datetime)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode the content to JSON with orjson, or the stdlib encoder without it. The models from scrum.models
+    are encoded with their aliases without being validated again
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(',', ':'), default=_default).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response, which skips jsonable_encoder, the content can be a model from scrum.models,
+    a list of them or JSON compatible data
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,20 @@
+from typing import Any, List, Optional
+
+from scrum.api.utils.pagination import next_page_headers
+from scrum.api.utils.responses import FastJSONResponse
+
+
+def row_response(row: Any) -> FastJSONResponse:
+    """
+    Serialize a read model from scrum.models.rows straight to JSON, bypassing the response_model
+    """
+    return FastJSONResponse(content=row.to_json())
+
+
+def rows_response(rows: List[Any], limit: Optional[int] = None) -> FastJSONResponse:
+    """
+    Serialize read models from scrum.models.rows straight to JSON, bypassing the response_model.
+    The cursor of the next page is sent like by page_response
+    """
+    return FastJSONResponse(content=[row.to_json() for row in rows],
+                            headers=next_page_headers(rows, limit))
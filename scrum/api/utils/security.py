@@ -1,17 +1,35 @@
+import time
+from typing import Optional, Tuple
+
 import jwt
 from fastapi import Depends, Security, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import PyJWTError
-from starlette.status import HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
+from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND, \
+    HTTP_503_SERVICE_UNAVAILABLE
 
+from scrum.api.utils.authorization import seed_project_authorization
 from scrum.api.utils.db import get_db
 from scrum.core import config
+from scrum.core.cache import TTLCache
 from scrum.core.jwt import TOKEN_ALGORITHM
+from scrum.core.security import password_hasher, PasswordHasherBusy
 from scrum.db.session import Session
 from scrum.db_models.user import User
 from scrum.models.token import TokenPayload
 from scrum.repositories.users import UserRepository
 
+# token -> decoded payload, an entry never outlives the token itself
+token_cache = TTLCache(config.TOKEN_CACHE_SIZE, config.TOKEN_CACHE_TTL)
+token_outdated = HTTPException(
+    status_code=HTTP_401_UNAUTHORIZED,
+    detail='Токен устарел, его необходимо обновить'
+)
+hasher_busy = HTTPException(
+    status_code=HTTP_503_SERVICE_UNAVAILABLE,
+    detail='Сервер перегружен, повторите попытку позже'
+)
+
 
 def get_oauth_schema() -> OAuth2PasswordBearer:
     """
@@ -20,10 +38,10 @@ def get_oauth_schema() -> OAuth2PasswordBearer:
     return OAuth2PasswordBearer(tokenUrl='')
 
 
-def get_current_user(
-        session: Session = Depends(get_db),
-        token: str = Security(get_oauth_schema())
-) -> User:
+def decode_token(token: str) -> TokenPayload:
+    token_data = token_cache.get(token)
+    if token_data is not None:
+        return token_data
     try:
         payload = jwt.decode(token, config.SECRET_KEY, algorithm=TOKEN_ALGORITHM)
         token_data = TokenPayload(**payload)
@@ -32,11 +50,53 @@ def get_current_user(
             status_code=HTTP_403_FORBIDDEN,
             detail='Невозможно расшифорвать JWT'
         )
+    ttl = min(config.TOKEN_CACHE_TTL, payload['exp'] - time.time())
+    if ttl > 0:
+        token_cache.set(token, token_data, ttl=ttl)
+    return token_data
+
+
+def get_current_user(
+        session: Session = Depends(get_db),
+        token: str = Security(get_oauth_schema())
+) -> User:
+    token_data = decode_token(token)
     repository = UserRepository(session)
-    user = repository.fetch(token_data.user_id)
+    user = repository.fetch_cached(token_data.user_id)
     if user is None:
         raise HTTPException(
             status_code=HTTP_404_NOT_FOUND,
             detail=f'Юзер с таким id не найден'
         )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN,
+            detail='Аккаунт данного пользователя не активен'
+        )
+    if token_data.access_version is not None:
+        # the user's version is cached with the user, so a fresh token is authorized without the database
+        if token_data.access_version != user.access_version:
+            raise token_outdated
+        seed_project_authorization(session, token_data)
     return user
+
+
+async def hash_password(plain_password: str) -> str:
+    """
+    Hash user's password on the password hasher's process pool
+    """
+    try:
+        return await password_hasher.hash(plain_password)
+    except PasswordHasherBusy:
+        raise hasher_busy
+
+
+async def check_password(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify user's password on the password hasher's process pool
+    :return: if the password is valid and its new hash, if the old one is outdated
+    """
+    try:
+        return await password_hasher.verify_and_update(plain, hashed)
+    except PasswordHasherBusy:
+        raise hasher_busy
@@ -1,28 +1,54 @@
+from databases import Database
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from starlette.status import HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN
 
+from scrum.api.utils.authorization import ProjectAuthorization, get_project_authorization_async
 from scrum.api.utils.projects import has_access_to_project, is_project_owner
-from scrum.repositories.projects import ProjectRepository
+from scrum.repositories.projects import ProjectRepository, AsyncProjectRepository
+
+project_not_found = HTTPException(
+    status_code=HTTP_400_BAD_REQUEST,
+    detail='Проекта с данным id не существует'
+)
 
 
 def validate_project(user_id: int, project_id: int, is_superuser: bool, *, session: Session = None,
                      check_owner: bool = False):
     project_repo = ProjectRepository(session)
     if project_repo.fetch(project_id) is None:
-        raise HTTPException(
-            status_code=HTTP_400_BAD_REQUEST,
-            detail='Проекта с данным id не существует'
-        )
+        raise project_not_found
     if not is_superuser and not has_access_to_project(session, user_id, project_id):
-        raise HTTPException(
-            status_code=HTTP_403_FORBIDDEN,
-            detail=f'Текущий пользователь не имеет доступа к проекту {project_id}'
-        )
+        raise no_access(project_id)
     if check_owner:
         if (not is_superuser and
                 not is_project_owner(session, user_id, project_id)):
-            raise HTTPException(
-                status_code=HTTP_403_FORBIDDEN,
-                detail='Текущий пользователь не имеет права на это действие в данном проекте'
-            )
\ No newline at end of file
+            raise not_owner()
+
+
+async def validate_project_async(user_id: int, project_id: int, is_superuser: bool, *,
+                                 database: Database, check_owner: bool = False):
+    project_repo = AsyncProjectRepository(database)
+    if await project_repo.fetch(project_id) is None:
+        raise project_not_found
+    if is_superuser:
+        return
+    authorization: ProjectAuthorization = await get_project_authorization_async(database, user_id)
+    if not authorization.has_access(project_id):
+        raise no_access(project_id)
+    if check_owner and not authorization.is_owner(project_id):
+        raise not_owner()
+
+
+def no_access(project_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=HTTP_403_FORBIDDEN,
+        detail=f'Текущий пользователь не имеет доступа к проекту {project_id}'
+    )
+
+
+def not_owner() -> HTTPException:
+    return HTTPException(
+        status_code=HTTP_403_FORBIDDEN,
+        detail='Текущий пользователь не имеет права на это действие в данном проекте'
+    )
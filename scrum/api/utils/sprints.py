@@ -1,21 +1,11 @@
 import datetime as dt
-from typing import List
+from typing import List, Dict, Set
 
 from scrum.api.utils.tasks import task_response
 from scrum.db_models.sprint import Sprint as DBSprint
 from scrum.models.sprint import Sprint
 
 
-def has_intersecting_sprint(start_date: dt.date, all_sprints: List[DBSprint], length: int = 2) -> bool:
-    end_date = start_date + dt.timedelta(weeks=length)
-    for db_sprint in all_sprints:
-        has_any = (db_sprint.start_date <= start_date <= db_sprint.end_date or
-                   db_sprint.start_date <= end_date <= db_sprint.end_date)
-        if has_any:
-            return True
-    return False
-
-
 def date_range(start_date: dt.date, end_date: dt.date) -> List[str]:
     step = dt.timedelta(days=1)
     current = dt.date(start_date.year, start_date.month, start_date.day)
@@ -26,8 +16,34 @@ def date_range(start_date: dt.date, end_date: dt.date) -> List[str]:
     return dates
 
 
-def sprint_response(sprint_db: DBSprint) -> Sprint:
-    sprint_dict = sprint_db.__dict__
+def remaining_weight(start_date: dt.date, end_date: dt.date, total_weight: int,
+                     done_by_day: Dict[dt.date, int]) -> List[int]:
+    """
+    Calculate weight remaining at the end of each sprint's day,
+    weight done before the sprint started counts for its first day
+    """
+    remaining = total_weight - sum(weight for day, weight in done_by_day.items() if day < start_date)
+    step = dt.timedelta(days=1)
+    current = start_date
+    result: List[int] = []
+    while current <= end_date:
+        remaining -= done_by_day.get(current, 0)
+        result.append(remaining)
+        current += step
+    return result
+
+
+def sprint_response(sprint_db: DBSprint, fields: Set[str] = None) -> Sprint:
+    """
+    :param fields: sparse fieldset, only these fields are read from the sprint
+    and set in the response, the response isn't validated then
+    """
+    if fields is not None:
+        values = {name: getattr(sprint_db, name) for name in fields - {'tasks'}}
+        if 'tasks' in fields:
+            values['tasks'] = [task_response(task) for task in sprint_db.tasks]
+        return Sprint.construct(values, set(values))
+    sprint_dict = dict(sprint_db.__dict__)
     tasks = [task_response(task) for task in sprint_db.tasks]
-    del sprint_dict['tasks']
+    sprint_dict.pop('tasks', None)
     return Sprint(tasks=tasks, **sprint_dict)
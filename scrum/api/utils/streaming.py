@@ -0,0 +1,54 @@
+from typing import Any, Callable, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+from scrum.api.utils.responses import dumps
+from scrum.core import config
+from scrum.db.session import Session as SessionFactory
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+
+def wants_stream(request: Request, stream: bool) -> bool:
+    """
+    Check if the client asked for a stream with the query flag or the Accept header
+    """
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get('accept', '')
+
+
+def ndjson_response(repository_class: type, fetch: Callable[..., List[Any]],
+                    serialize: Callable[[Any], BaseModel]) -> StreamingResponse:
+    """
+    Stream rows as newline delimited JSON, reading them in keyset batches of STREAM_BATCH_SIZE.
+    The body is sent after the request's session is released, so the stream uses its own session
+    :param repository_class: repository, which is created with the stream's session
+    :param fetch: a repository's method, which accepts limit and after keyword arguments
+    :param serialize: function, which converts a row to the response model
+    """
+
+    def next_batch(session: Session, after: Optional[int]) -> Tuple[bytes, Optional[int]]:
+        rows = fetch(repository_class(session), limit=config.STREAM_BATCH_SIZE, after=after)
+        last_id = rows[-1].id if len(rows) == config.STREAM_BATCH_SIZE else None
+        lines = b''.join(dumps(serialize(row)) + b'\n' for row in rows)
+        # rows of the sent batches are not needed anymore
+        session.expunge_all()
+        return lines, last_id
+
+    async def lines():
+        session = SessionFactory()
+        try:
+            after = None
+            while True:
+                chunk, after = await run_in_threadpool(next_batch, session, after)
+                if chunk:
+                    yield chunk
+                if after is None:
+                    break
+        finally:
+            await run_in_threadpool(session.close)
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
@@ -1,21 +1,59 @@
-from typing import List
+from typing import List, Set
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_404_NOT_FOUND
 
 from scrum.db_models.task import Task as DBTask
 from scrum.models.tag import Tag
 from scrum.models.task import Task
 from scrum.models.users import User
+from scrum.repositories.tasks import TaskRepository
+
+TASK_RELATIONS = {'creator', 'assignee', 'tags'}
+
 
+def fetch_task(session: Session, task_id: int) -> DBTask:
+    """
+    Fetch the task or raise 404
+    """
+    task = TaskRepository(session).fetch(task_id)
+    if task is None:
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND,
+            detail='Задачи с таким id не существует'
+        )
+    return task
 
-def task_response(db_task: DBTask) -> Task:
+
+def task_response(db_task: DBTask, fields: Set[str] = None) -> Task:
+    """
+    :param fields: sparse fieldset, only these fields are read from the task
+    and set in the response, the response isn't validated then
+    """
+    if fields is not None:
+        return _sparse_task_response(db_task, fields)
     creator = User(**db_task.creator.__dict__)
     assignee = User(**db_task.assignee.__dict__) if db_task.assignee is not None else None
     tags = [Tag(**tag.__dict__) for tag in db_task.tags]
-    task_dict = db_task.__dict__
+    # a copy, the instance's __dict__ is its state in the session's identity map
+    task_dict = dict(db_task.__dict__)
     del task_dict['creator']
     del task_dict['tags']
     del task_dict['assignee']
     return Task(assignee=assignee, creator=creator, tags=tags, **task_dict)
 
 
-def tasks_response(db_tasks: List[DBTask]) -> List[Task]:
-    return [task_response(task) for task in db_tasks]
+def tasks_response(db_tasks: List[DBTask], fields: Set[str] = None) -> List[Task]:
+    return [task_response(task, fields) for task in db_tasks]
+
+
+def _sparse_task_response(db_task: DBTask, fields: Set[str]) -> Task:
+    values = {name: getattr(db_task, name) for name in fields - TASK_RELATIONS}
+    if 'creator' in fields:
+        values['creator'] = User(**db_task.creator.__dict__)
+    if 'assignee' in fields:
+        values['assignee'] = User(**db_task.assignee.__dict__) if db_task.assignee is not None else None
+    if 'tags' in fields:
+        values['tags'] = [Tag(**tag.__dict__) for tag in db_task.tags]
+    return Task.construct(values, set(values))
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from scrum.api.v1.endpoints import users, auth, projects, sprints, tasks, tags
+from scrum.api.v1.endpoints import users, auth, projects, sprints, tasks, tags, stats
 
 api_router = APIRouter()
 
@@ -10,3 +10,4 @@ api_router.include_router(projects.router, tags=['projects'])
 api_router.include_router(sprints.router, tags=['sprints'])
 api_router.include_router(tasks.router, tags=['tasks'])
 api_router.include_router(tags.router, tags=['tags'])
+api_router.include_router(stats.router, tags=['stats'])
@@ -1,27 +1,72 @@
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
 
-from scrum.api.utils.db import get_db
+from typing import Mapping
+
+from databases import Database
+from fastapi import APIRouter, Depends, HTTPException, Security
+
+from scrum.api.utils.db import get_async_db
+from scrum.api.utils.security import check_password, decode_token, get_oauth_schema
 from scrum.core import config
-from scrum.core.jwt import create_access_token
-from scrum.core.security import verify_password
+from scrum.core.jwt import create_access_token, access_claims
 from scrum.models.token import Token
 from scrum.models.users import UserAuth
-from scrum.repositories.users import UserRepository
+from scrum.repositories.accessible_project import AsyncAccessibleProjectRepository
+from scrum.repositories.users import AsyncUserRepository
 
 router = APIRouter()
 
 
 @router.post('/login', response_model=Token)
-def login(session: Session = Depends(get_db), user_auth: UserAuth = None):
-    repository = UserRepository(session)
-    user = repository.fetch_by_username(user_auth.username)
-    if user is None or not verify_password(user_auth.password, user.hashed_password):
+async def login(database: Database = Depends(get_async_db), user_auth: UserAuth = None):
+    """
+    Issue an access token, outdated hashes of the password are upgraded
+    """
+    repository = AsyncUserRepository(database)
+    user = await repository.fetch_by_username(user_auth.username)
+    if user is None:
+        raise HTTPException(401, detail='Неверное имя пользователя или пароль')
+    valid, new_hash = await check_password(user_auth.password, user['hashed_password'])
+    if not valid:
         raise HTTPException(401, detail='Неверное имя пользователя или пароль')
-    if not user.is_active:
+    if not user['is_active']:
+        raise HTTPException(403, detail='Аккаунт данного пользователя не активен')
+    if new_hash is not None:
+        await repository.update_password_hash(user['id'], new_hash)
+    return {
+        'token': await issue_token(database, user)
+    }
+
+
+@router.post('/refresh_token', response_model=Token)
+async def refresh_token(
+        database: Database = Depends(get_async_db),
+        token: str = Security(get_oauth_schema())
+):
+    """
+    Issue a new access token for a valid one, the claims of a stale token are brought up to date
+    """
+    token_data = decode_token(token)
+    user = await AsyncUserRepository(database).fetch(token_data.user_id)
+    if user is None:
+        raise HTTPException(404, detail='Юзер с таким id не найден')
+    if not user['is_active']:
         raise HTTPException(403, detail='Аккаунт данного пользователя не активен')
-    token_expires = timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
-        'token': create_access_token(data={'user_id': user.id}, expires_delta=token_expires)
+        'token': await issue_token(database, user)
     }
+
+
+async def issue_token(database: Database, user: Mapping) -> str:
+    """
+    Create an access token for the user, it carries the user's claims with ACCESS_TOKEN_CLAIMS
+    :param user: user's row with the access version
+    """
+    data = {'user_id': user['id']}
+    if config.ACCESS_TOKEN_CLAIMS:
+        roles = await AsyncAccessibleProjectRepository(database).fetch_roles_for_user(user['id'])
+        data.update(access_claims(is_active=user['is_active'], is_superuser=user['is_superuser'],
+                                  access_version=user['access_version'],
+                                  roles={project_id: role.value for project_id, role in roles.items()}))
+    token_expires = timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return create_access_token(data=data, expires_delta=token_expires)
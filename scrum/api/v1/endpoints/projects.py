@@ -2,10 +2,16 @@ from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from starlette.requests import Request
 from starlette.status import HTTP_404_NOT_FOUND, HTTP_403_FORBIDDEN
 
+from scrum.api.utils.authorization import get_project_authorization, reset_project_authorization
 from scrum.api.utils.db import get_db
+from scrum.api.utils.etag import make_etag, not_modified
+from scrum.api.utils.fields import parse_fields, fields_response
+from scrum.api.utils.pagination import page_params, page_response
 from scrum.api.utils.projects import has_access_to_project, is_project_owner, project_response
+from scrum.api.utils.rows import rows_response, row_response
 from scrum.api.utils.security import get_current_user
 from scrum.api.utils.shared import validate_project
 from scrum.api.utils.users import user_response
@@ -13,25 +19,52 @@ from scrum.db_models.user import User as DBUser
 from scrum.models.project import Project, ProjectCreate, ProjectAccess, AccessOp
 from scrum.models.users import User
 from scrum.repositories.accessible_project import AccessibleProjectRepository
-from scrum.repositories.projects import ProjectRepository
+from scrum.repositories.projects import ProjectRepository, ProjectRowRepository
 from scrum.repositories.users import UserRepository
+from scrum.repositories.versions import VersionRepository
 
 router = APIRouter()
 
 
 @router.get('/projects', response_model=List[Project])
 def get_projects(
+        request: Request,
+        limit: int = None,
+        cursor: str = None,
+        fields: str = None,
+        *,
         session: Session = Depends(get_db),
         current_user: DBUser = Depends(get_current_user)
 ):
-    project_repo = ProjectRepository(session)
+    """
+    Fetch projects, fields limits the response to the comma separated list of project's fields.
+    The response has an ETag derived from the projects' versions,
+    If-None-Match is answered with 304 without reading the projects.
+    All projects, which only a superuser can list, are always paginated
+    """
+    limit, after = page_params(limit, cursor, whole_table=current_user.is_superuser)
+    fields = parse_fields(fields, Project)
     if current_user.is_superuser:
-        projects = project_repo.fetch_all([], current_user.is_superuser)
+        project_ids = None
     else:
-        accessible_repo = AccessibleProjectRepository(session)
-        projects = project_repo.fetch_all(accessible_repo.fetch_accessible_for_user(current_user.id),
-                                          current_user.is_superuser)
-    return [project_response(project) for project in projects]
+        project_ids = get_project_authorization(session, current_user.id).project_ids
+    etag = make_etag(request, VersionRepository(session).fetch_projects(project_ids))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    if fields is None:
+        project_repo = ProjectRowRepository(session)
+        response = rows_response(project_repo.fetch_all(project_ids, limit, after), limit)
+    else:
+        project_repo = ProjectRepository(session)
+        projects = project_repo.fetch_all(project_ids or [], current_user.is_superuser, limit, after, fields)
+        projects = [project_response(project, fields) for project in projects]
+        if limit is not None:
+            response = page_response(projects, Project, limit, fields)
+        else:
+            response = fields_response(projects)
+    response.headers['ETag'] = etag
+    return response
 
 
 @router.get('/projects/unique')
@@ -51,11 +84,15 @@ def is_unique_name(
 @router.get('/projects/{project_id}', response_model=Project)
 def get_project(
         project_id: int,
+        fields: str = None,
         session: Session = Depends(get_db),
         current_user: DBUser = Depends(get_current_user)
 ):
-    repository = ProjectRepository(session)
-    project = repository.fetch(project_id)
+    fields = parse_fields(fields, Project)
+    if fields is None:
+        project = ProjectRowRepository(session).fetch(project_id)
+    else:
+        project = ProjectRepository(session).fetch(project_id, fields)
     if project is None:
         raise HTTPException(
             status_code=HTTP_404_NOT_FOUND,
@@ -66,7 +103,9 @@ def get_project(
             status_code=HTTP_403_FORBIDDEN,
             detail='У текущего пользователя нет доступа к данному проекту'
         )
-    return project_response(project)
+    if fields is None:
+        return row_response(project)
+    return fields_response(project_response(project, fields))
 
 
 @router.post('/projects', response_model=Project, status_code=201)
@@ -153,5 +192,6 @@ def give_access(data: ProjectAccess,
     else:
         accessible_repo = AccessibleProjectRepository(session)
         accessible_repo.delete(project.id, user.id)
+    reset_project_authorization(session, user.id)
     users = user_repo.fetch_by_project(project.id)
     return [user_response(user) for user in users]
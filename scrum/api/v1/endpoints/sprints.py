@@ -1,18 +1,25 @@
-from functools import reduce
+from functools import partial
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from starlette.status import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+from starlette.requests import Request
+from starlette.status import HTTP_404_NOT_FOUND
 
+from scrum.api.utils.authorization import get_project_authorization
 from scrum.api.utils.db import get_db
+from scrum.api.utils.fields import parse_fields, fields_response
+from scrum.api.utils.pagination import page_params, page_response
+from scrum.api.utils.responses import FastJSONResponse
+from scrum.api.utils.rows import rows_response, row_response
 from scrum.api.utils.security import get_current_user
 from scrum.api.utils.shared import validate_project
-from scrum.api.utils.sprints import has_intersecting_sprint, date_range, sprint_response
+from scrum.api.utils.sprints import date_range, sprint_response, remaining_weight
+from scrum.api.utils.streaming import wants_stream, ndjson_response
 from scrum.db_models.user import User
 from scrum.models.sprint import SprintCreate, Sprint, OngoingSprint, IntersectionCheck, ChartData
-from scrum.repositories.accessible_project import AccessibleProjectRepository
-from scrum.repositories.sprints import SprintRepository
+from scrum.repositories.burndown import BurndownRepository
+from scrum.repositories.sprints import SprintRepository, SprintRowRepository, sprint_intersects
 
 router = APIRouter()
 
@@ -35,21 +42,10 @@ def get_chart_data(
                      current_user.is_superuser, session=session)
     # gather a list of all dates from the sprint
     labels = date_range(sprint.start_date, sprint.end_date)
-    total_weight = reduce(lambda acc, t: acc + t.weight, sprint.tasks, 0)
-    data = {label: total_weight for label in labels}
-    # calculate weight for each day
-    for task in sprint.tasks:
-        if task.done_date is not None:
-            data[str(task.done_date)] -= task.weight
+    burndown_repo = BurndownRepository(session)
+    total_weight, done_by_day = burndown_repo.fetch(sprint)
     step = float(total_weight) / (len(labels) - 1)
-    progress_data = list(data.values())
-    current_weight = total_weight
-    # recalculate weight for each day, based on previous value
-    for i, value in enumerate(progress_data):
-        if value < current_weight:
-            current_weight = value
-        elif value > current_weight:
-            progress_data[i] = current_weight
+    progress_data = remaining_weight(sprint.start_date, sprint.end_date, total_weight, done_by_day)
     return {
         'data': [
             {
@@ -73,34 +69,62 @@ def ongoing_sprint(
 ):
     validate_project(current_user.id, project_id,
                      current_user.is_superuser, session=session)
-    sprint_repo = SprintRepository(session)
-    return {
-        'sprint': sprint_repo.fetch_ongoing(project_id)
-    }
+    sprint = SprintRowRepository(session).fetch_ongoing(project_id)
+    return FastJSONResponse({
+        'sprint': sprint and sprint.to_json()
+    })
 
 
 @router.get('/sprints', response_model=List[Sprint])
 def get_sprints(
+        request: Request,
         project_id: int = None,
+        limit: int = None,
+        cursor: str = None,
+        stream: bool = False,
+        fields: str = None,
         *,
         session: Session = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    accessible_repo = AccessibleProjectRepository(session)
-    accessible_projects = accessible_repo.fetch_accessible_for_user(current_user.id)
+    """
+    Fetch sprints, the list can be paginated with limit and cursor or streamed
+    as NDJSON with the stream flag or the Accept header. Streamed sprints contain their tasks.
+    Fields limits the response to the comma separated list of sprint's fields
+    """
+    limit, after = page_params(limit, cursor)
+    fields = parse_fields(fields, Sprint)
+    authorization = get_project_authorization(session, current_user.id)
+    if wants_stream(request, stream):
+        fetch = partial(SprintRepository.fetch_all, accessible_projects=authorization.project_ids,
+                        project_id=project_id, with_tasks=True, fields=fields)
+        return ndjson_response(SprintRepository, fetch, partial(sprint_response, fields=fields))
+    if fields is None:
+        project_ids = [project_id] if project_id is not None else authorization.project_ids
+        sprint_repo = SprintRowRepository(session)
+        return rows_response(sprint_repo.fetch_all(project_ids, limit, after), limit)
     sprint_repo = SprintRepository(session)
-    return sprint_repo.fetch_all(accessible_projects, project_id)
+    sprints = sprint_repo.fetch_all(authorization.project_ids, project_id, limit, after, fields=fields)
+    sprints = [sprint_response(sprint, fields) for sprint in sprints]
+    if limit is not None:
+        return page_response(sprints, Sprint, limit, fields)
+    return fields_response(sprints)
 
 
 @router.get('/sprints/{sprint_id}', response_model=Sprint)
 def get_sprint(
         sprint_id: int,
+        fields: str = None,
         *,
         session: Session = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
-    sprint_repo = SprintRepository(session)
-    sprint = sprint_repo.fetch(sprint_id)
+    fields = parse_fields(fields, Sprint)
+    if fields is None:
+        sprint = SprintRowRepository(session).fetch(sprint_id)
+    else:
+        # the project is always loaded for the access check
+        sprint = SprintRepository(session).fetch(sprint_id, fields | {'project_id'})
     if sprint is None:
         raise HTTPException(
             status_code=HTTP_404_NOT_FOUND,
@@ -108,7 +132,9 @@ def get_sprint(
         )
     validate_project(current_user.id, sprint.project_id,
                      current_user.is_superuser, session=session)
-    return sprint_response(sprint)
+    if fields is None:
+        return row_response(sprint)
+    return fields_response(sprint_response(sprint, fields))
 
 
 @router.post('/sprints', status_code=201, response_model=Sprint)
@@ -121,13 +147,9 @@ def create_sprint(
                      current_user.is_superuser,
                      session=session, check_owner=True)
     sprint_repo = SprintRepository(session)
-    # get all sprints for the intersection check
-    sprints = sprint_repo.fetch_all([], sprint_in.project_id)
-    if has_intersecting_sprint(sprint_in.start_date, sprints):
-        raise HTTPException(
-            status_code=HTTP_400_BAD_REQUEST,
-            detail='Для такой даты начала спринта существует пересекающийся спринт'
-        )
+    # the exclusion constraint rejects the sprints, which intersect because of a concurrent request
+    if sprint_repo.has_intersection(sprint_in.project_id, sprint_in.start_date):
+        raise sprint_intersects
     created_sprint = sprint_repo.create(sprint_in)
     return created_sprint
 
@@ -163,9 +185,8 @@ def check_intersection(
     validate_project(current_user.id, data.project_id,
                      current_user.is_superuser, session=session)
     sprint_repo = SprintRepository(session)
-    all_sprints = sprint_repo.fetch_by_project(data.project_id)
     return {
-        'has_intersection': has_intersecting_sprint(data.start_date, all_sprints)
+        'has_intersection': sprint_repo.has_intersection(data.project_id, data.start_date)
     }
 
 
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.status import HTTP_403_FORBIDDEN
+
+from scrum.api.utils.security import get_current_user, token_cache
+from scrum.db.session import engine
+from scrum.db_models.user import User
+from scrum.repositories.accessible_project import role_cache
+from scrum.repositories.sprints import ongoing_cache
+from scrum.repositories.users import user_cache
+
+router = APIRouter()
+
+
+@router.get('/stats')
+def get_stats(current_user: User = Depends(get_current_user)):
+    """
+    Live statistics of the connection pool and in-process caches
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN,
+            detail='Статистика доступна только администратору'
+        )
+    return {
+        'pool': engine.pool.stats(),
+        'caches': {
+            'roles': role_cache.stats(),
+            'users': user_cache.stats(),
+            'tokens': token_cache.stats(),
+            'ongoing_sprints': ongoing_cache.stats(),
+        }
+    }
@@ -1,54 +1,79 @@
 from typing import List
 
+from databases import Database
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from starlette.requests import Request
 from starlette.status import HTTP_404_NOT_FOUND
 
-from scrum.api.utils.db import get_db
+from scrum.api.utils.authorization import get_project_authorization_async
+from scrum.api.utils.db import get_db, get_async_db
+from scrum.api.utils.etag import make_etag, not_modified
+from scrum.api.utils.pagination import page_params
+from scrum.api.utils.rows import rows_response, row_response
 from scrum.api.utils.security import get_current_user
-from scrum.api.utils.shared import validate_project
+from scrum.api.utils.shared import validate_project, validate_project_async
 from scrum.db_models.user import User
 from scrum.models.tag import TagCreate, Tag
-from scrum.repositories.accessible_project import AccessibleProjectRepository
-from scrum.repositories.tags import TagRepository
+from scrum.repositories.tags import TagRepository, AsyncTagRepository
+from scrum.repositories.versions import AsyncVersionRepository
 
 router = APIRouter()
 
 
 @router.get('/tags', response_model=List[Tag])
-def get_tags(
+async def get_tags(
+        request: Request,
         project_id: int = None,
+        limit: int = None,
+        cursor: str = None,
         *,
-        session: Session = Depends(get_db),
+        database: Database = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
-    tag_repo = TagRepository(session)
+    """
+    Fetch tags, the response has an ETag derived from the versions of the tags' projects,
+    If-None-Match is answered with 304 without reading the tags
+    """
+    limit, after = page_params(limit, cursor)
     if project_id is not None:
-        validate_project(current_user.id, project_id, current_user.is_superuser,
-                         session=session)
-        return tag_repo.fetch_by_project(project_id)
-    accessible_repo = AccessibleProjectRepository(session)
-    accessible_projects = accessible_repo.fetch_accessible_for_user(current_user.id)
-    return tag_repo.fetch_accessible(accessible_projects)
+        await validate_project_async(current_user.id, project_id, current_user.is_superuser,
+                                     database=database)
+        project_ids = [project_id]
+    else:
+        authorization = await get_project_authorization_async(database, current_user.id)
+        project_ids = authorization.project_ids
+    etag = make_etag(request, await AsyncVersionRepository(database).fetch_projects(project_ids))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    tag_repo = AsyncTagRepository(database)
+    if project_id is not None:
+        tags = await tag_repo.fetch_by_project(project_id, limit, after)
+    else:
+        tags = await tag_repo.fetch_accessible(project_ids, limit, after)
+    response = rows_response(tags, limit)
+    response.headers['ETag'] = etag
+    return response
 
 
 @router.get('/tags/{tag_id}', response_model=Tag)
-def get_tag(
+async def get_tag(
         tag_id: int,
         *,
-        session: Session = Depends(get_db),
+        database: Database = Depends(get_async_db),
         current_user: User = Depends(get_current_user)
 ):
-    tag_repo = TagRepository(session)
-    tag = tag_repo.fetch(tag_id)
+    tag_repo = AsyncTagRepository(database)
+    tag = await tag_repo.fetch(tag_id)
     if tag is None:
         raise HTTPException(
             status_code=HTTP_404_NOT_FOUND,
             detail='Тега с таким id не существует'
         )
-    validate_project(current_user.id, tag.project_id,
-                     current_user.is_superuser, session=session)
-    return tag
+    await validate_project_async(current_user.id, tag.project_id,
+                                 current_user.is_superuser, database=database)
+    return row_response(tag)
 
 
 @router.post('/tags', response_model=Tag)
@@ -1,45 +1,78 @@
 import datetime as dt
+from functools import partial
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from starlette.requests import Request
 from starlette.status import HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
 
+from scrum.api.utils.authorization import get_project_authorization
 from scrum.api.utils.db import get_db
+from scrum.api.utils.etag import make_etag, not_modified
+from scrum.api.utils.fields import parse_fields, fields_response
+from scrum.api.utils.pagination import page_params, page_response
 from scrum.api.utils.projects import has_access_to_project, is_project_owner
+from scrum.api.utils.responses import FastJSONResponse
+from scrum.api.utils.rows import rows_response, row_response
 from scrum.api.utils.security import get_current_user
 from scrum.api.utils.shared import validate_project
-from scrum.api.utils.tasks import tasks_response, task_response
+from scrum.api.utils.streaming import wants_stream, ndjson_response
+from scrum.api.utils.tasks import tasks_response, task_response, fetch_task
 from scrum.db_models.task_state import TaskState
 from scrum.db_models.user import User as DBUser
 from scrum.models.task import Task, TaskCreate, TaskBoard, TaskBoardUpdate, TaskAssign
 from scrum.models.users import User
-from scrum.repositories.accessible_project import AccessibleProjectRepository
 from scrum.repositories.sprints import SprintRepository
-from scrum.repositories.tasks import TaskRepository
+from scrum.repositories.tasks import TaskRepository, TaskRowRepository
 from scrum.repositories.users import UserRepository
+from scrum.repositories.versions import VersionRepository
 
 router = APIRouter()
 
 
 @router.get('/tasks', response_model=List[Task])
 def get_tasks(
+        request: Request,
         project_id: int = None,
+        limit: int = None,
+        cursor: str = None,
+        stream: bool = False,
+        fields: str = None,
         *,
         session: Session = Depends(get_db),
         current_user: DBUser = Depends(get_current_user)
 ):
-    task_repo = TaskRepository(session)
+    """
+    Fetch tasks, the list can be paginated with limit and cursor
+    or streamed as NDJSON with the stream flag or the Accept header.
+    All tasks, which only a superuser can list, are always paginated.
+    Fields limits the response to the comma separated list of task's fields
+    """
+    limit, after = page_params(limit, cursor, whole_table=current_user.is_superuser and project_id is None)
+    fields = parse_fields(fields, Task)
     if project_id is not None:
         validate_project(current_user.id, project_id,
                          current_user.is_superuser, session=session)
-        tasks = task_repo.fetch_from_project(project_id)
+        fetch = partial(TaskRepository.fetch_from_project, project_id=project_id, fields=fields)
+        project_ids = [project_id]
     elif current_user.is_superuser:
-        tasks = task_repo.fetch_all()
+        fetch = partial(TaskRepository.fetch_all, fields=fields)
+        project_ids = None
     else:
-        accessible_repo = AccessibleProjectRepository(session)
-        tasks = task_repo.fetch_accessible(accessible_repo.fetch_accessible_for_user(current_user.id))
-    return tasks_response(tasks)
+        authorization = get_project_authorization(session, current_user.id)
+        fetch = partial(TaskRepository.fetch_accessible, accessible_projects=authorization.project_ids,
+                        fields=fields)
+        project_ids = authorization.project_ids
+    if wants_stream(request, stream):
+        return ndjson_response(TaskRepository, fetch, partial(task_response, fields=fields))
+    if fields is None:
+        task_repo = TaskRowRepository(session)
+        return rows_response(task_repo.fetch_all(project_ids, limit=limit, after=after), limit)
+    tasks = fetch(TaskRepository(session), limit=limit, after=after)
+    if limit is not None:
+        return page_response(tasks_response(tasks, fields), Task, limit, fields)
+    return fields_response(tasks_response(tasks, fields))
 
 
 @router.post('/tasks', status_code=201)
@@ -92,43 +125,42 @@ def assign_user(
         session: Session = Depends(get_db),
         current_user: DBUser = Depends(get_current_user)
 ):
-    task_repo = TaskRepository(session)
-    task = task_repo.fetch(data.task_id)
-    if (not current_user.is_superuser and
-            not has_access_to_project(session, current_user.id, task.project_id)):
+    """
+    Assign a user to the task, user_id 0 assigns the current user
+    """
+    if data.user_id == 0:
+        return assign_me(data.task_id, session=session, current_user=current_user)
+    user = UserRepository(session).fetch(data.user_id)
+    if user is None:
         raise HTTPException(
-            status_code=HTTP_403_FORBIDDEN,
-            detail=f'Текущий пользователь не имеет доступа к проекту {task.project_id}'
+            status_code=HTTP_400_BAD_REQUEST,
+            detail='Пользователя с таким id не существует'
         )
-    if task is None:
+    if not user.is_active:
         raise HTTPException(
-            status_code=HTTP_404_NOT_FOUND,
-            detail='Задачи с таким id не существует'
+            status_code=HTTP_400_BAD_REQUEST,
+            detail='Пользователь с таким id не активен'
         )
-    if data.user_id != 0:
-        user_repo = UserRepository(session)
-        user = user_repo.fetch(data.user_id)
-        if user is None:
-            raise HTTPException(
-                status_code=HTTP_400_BAD_REQUEST,
-                detail='Пользователя с таким id не существует'
-            )
-        if (not user.is_superuser and
-                not has_access_to_project(session, user.id, task.project_id)):
+    # the task must belong to a project, which both the current and the assigned users can access
+    project_ids = None
+    for member in (current_user, user):
+        if not member.is_superuser:
+            member_projects = get_project_authorization(session, member.id).project_ids
+            project_ids = member_projects if project_ids is None else \
+                [project_id for project_id in project_ids if project_id in member_projects]
+    if TaskRepository(session).assign(data.task_id, user.id, project_ids) is None:
+        task = fetch_task(session, data.task_id)
+        if (not current_user.is_superuser and
+                not has_access_to_project(session, current_user.id, task.project_id)):
             raise HTTPException(
                 status_code=HTTP_403_FORBIDDEN,
-                detail=f'Назначаемый пользователь не имеет доступа к проекту {task.project_id}'
-            )
-        if not user.is_active:
-            raise HTTPException(
-                status_code=HTTP_400_BAD_REQUEST,
-                detail='Пользователь с таким id не активен'
+                detail=f'Текущий пользователь не имеет доступа к проекту {task.project_id}'
             )
-        task = task_repo.update(task, assignee_id=user.id)
-        return user
-    else:
-        task = task_repo.update(task, assgnee_id=current_user.id)
-        return current_user
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN,
+            detail=f'Назначаемый пользователь не имеет доступа к проекту {task.project_id}'
+        )
+    return user
 
 
 @router.post('/tasks/assign_me/{task_id}', response_model=User)
@@ -138,30 +170,31 @@ def assign_me(
         session: Session = Depends(get_db),
         current_user: DBUser = Depends(get_current_user)
 ):
-    task_repo = TaskRepository(session)
-    task = task_repo.fetch(task_id)
-    if task is None:
-        raise HTTPException(
-            status_code=HTTP_404_NOT_FOUND,
-            detail='Задачи с таким id не существует'
-        )
-    if (not current_user.is_superuser and
-            not has_access_to_project(session, current_user.id, task.project_id)):
+    project_ids = None
+    if not current_user.is_superuser:
+        project_ids = get_project_authorization(session, current_user.id).project_ids
+    if TaskRepository(session).assign(task_id, current_user.id, project_ids) is None:
+        task = fetch_task(session, task_id)
         raise HTTPException(
             status_code=HTTP_403_FORBIDDEN,
             detail=f'Текущий пользователь не имеет доступа к проекту {task.project_id}'
         )
-    task = task_repo.update(task, assignee_id=current_user.id)
     return current_user
 
 
 @router.get('/tasks/board', response_model=TaskBoard)
 def get_task_board(
+        request: Request,
         sprint_id: int,
+        fields: str = None,
         *,
         session: Session = Depends(get_db),
         current_user: DBUser = Depends(get_current_user)
 ):
+    """
+    Fetch the sprint's board, the response has an ETag derived from the versions
+    of the sprint and its project and If-None-Match is answered with 304 without reading the tasks
+    """
     sprint_repo = SprintRepository(session)
     sprint = sprint_repo.fetch(sprint_id)
     if sprint is None:
@@ -174,9 +207,18 @@ def get_task_board(
             status_code=HTTP_403_FORBIDDEN,
             detail=f'Текущий пользователь не имеет доступа к проекту {sprint.project_id}'
         )
+    fields = parse_fields(fields, Task)
+    # the project's version covers the tags of the tasks
+    etag = make_etag(request, sprint.version, VersionRepository(session).fetch_projects([sprint.project_id]))
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    task_repo = TaskRepository(session)
+    # the state is always loaded to place the tasks on the board
+    tasks = task_repo.fetch_from_sprint(sprint.id, fields and fields | {'state'})
     task_board = TaskBoard()
-    for task in sprint.tasks:
-        new_task = task_response(task)
+    for task in tasks:
+        new_task = task_response(task, fields)
         if task.state == TaskState.todo:
             task_board.todo.append(new_task)
         elif task.state == TaskState.in_process:
@@ -185,7 +227,8 @@ def get_task_board(
             task_board.testing.append(new_task)
         elif task.state == TaskState.done:
             task_board.done.append(new_task)
-    return task_board
+    # the board's tasks are already validated, so the response_model is skipped
+    return FastJSONResponse(content=task_board, headers={'ETag': etag})
 
 
 @router.put('/tasks/board')
@@ -219,14 +262,14 @@ def update_task_board(
             task_board.board.testing, task_board.board.done]
     tasks = [nested_task for sublist in cols for nested_task in sublist]
     task_repo = TaskRepository(session)
+    placement = task_repo.fetch_placement([task.id for task in tasks])
     for task in tasks:
-        task_db = task_repo.fetch(task.id)
-        if task_db is None:
+        if task.id not in placement:
             raise HTTPException(
                 status_code=HTTP_400_BAD_REQUEST,
                 detail=f'Задачи с id={task.id} не существует'
             )
-        if task.project_id != task_board.project_id or task.sprint_id != task_board.sprint_id:
+        if placement[task.id] != (task_board.project_id, task_board.sprint_id):
             raise HTTPException(
                 status_code=HTTP_400_BAD_REQUEST,
                 detail=f'Задача с id={task.id} не содержится в данном спринте'
@@ -238,24 +281,31 @@ def update_task_board(
 @router.get('/tasks/{task_id}', response_model=Task)
 def get_task(
         task_id: int,
+        fields: str = None,
         *,
         session: Session = Depends(get_db),
         current_user: DBUser = Depends(get_current_user)
 ):
-    task_repo = TaskRepository(session)
-    task = task_repo.fetch(task_id)
+    fields = parse_fields(fields, Task)
+    if fields is None:
+        task = TaskRowRepository(session).fetch(task_id)
+    else:
+        # the project is always loaded for the access check
+        task = TaskRepository(session).fetch(task_id, fields | {'project_id'})
+    if task is None:
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND,
+            detail='Задачи с таким id не найдено'
+        )
     if (not current_user.is_superuser and
             not has_access_to_project(session, current_user.id, task.project_id)):
         raise HTTPException(
             status_code=HTTP_403_FORBIDDEN,
             detail=f'Текущий пользователь не имеет доступа к проекту {task.project_id}'
         )
-    if task is None:
-        raise HTTPException(
-            status_code=HTTP_404_NOT_FOUND,
-            detail='Задачи с таким id не найдено'
-        )
-    return task_response(task)
+    if fields is None:
+        return row_response(task)
+    return fields_response(task_response(task, fields))
 
 
 @router.put('/tasks/{task_id}', response_model=Task)
@@ -266,25 +316,21 @@ def update_task(
         session: Session = Depends(get_db),
         current_user: DBUser = Depends(get_current_user)
 ):
-    task_repo = TaskRepository(session)
-    task = task_repo.fetch(task_id)
-    if task is None:
-        raise HTTPException(
-            status_code=HTTP_404_NOT_FOUND,
-            detail='Задачи с данным id не существует'
-        )
+    # the task is updated without being loaded, it must belong to a project owned by the current user
+    project_ids = None
     if not current_user.is_superuser:
+        project_ids = get_project_authorization(session, current_user.id).owned_project_ids
+    values = {'description': task_in.description, 'name': task_in.name,
+              'weight': task_in.weight, 'priority': task_in.priority}
+    if TaskRepository(session).update(task_id, values, task_in.tags, project_ids) is None:
+        task = fetch_task(session, task_id)
         if not has_access_to_project(session, current_user.id, task.project_id):
             raise HTTPException(
                 status_code=HTTP_403_FORBIDDEN,
                 detail=f'Текущий пользователь не имеет доступа к проекту {task.project_id}'
             )
-        if not is_project_owner(session, current_user.id, task.project_id):
-            raise HTTPException(
-                status_code=HTTP_403_FORBIDDEN,
-                detail='Текущий пользователь не имеет права на изменение задач в данном проекте'
-            )
-    task = task_repo.update(task, task_in.tags, description=task_in.description,
-                            name=task_in.name, weight=task_in.weight,
-                            priority=task_in.priority)
-    return task_response(task)
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN,
+            detail='Текущий пользователь не имеет права на изменение задач в данном проекте'
+        )
+    return row_response(TaskRowRepository(session).fetch(task_id))
@@ -1,16 +1,18 @@
 from typing import List
 
+from databases import Database
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from scrum.api.utils.db import get_db
-from scrum.api.utils.security import get_current_user
+from scrum.api.utils.authorization import get_project_authorization
+from scrum.api.utils.db import get_db, get_async_db
+from scrum.api.utils.pagination import page_params, page_response
+from scrum.api.utils.security import get_current_user, hash_password
 from scrum.api.utils.shared import validate_project
 from scrum.api.utils.users import user_response
 from scrum.db_models.user import User as DBUser
 from scrum.models.users import User, UserAuth
-from scrum.repositories.accessible_project import AccessibleProjectRepository
-from scrum.repositories.users import UserRepository
+from scrum.repositories.users import UserRepository, AsyncUserRepository
 
 router = APIRouter()
 
@@ -18,34 +20,41 @@ router = APIRouter()
 @router.get('/users', response_model=List[User])
 def get_users(
         project_id: int = None,
+        limit: int = None,
+        cursor: str = None,
         *,
         session: Session = Depends(get_db),
         current_user: User = Depends(get_current_user)
 ):
     """
-    Fetch all users
+    Fetch all users, the list of all users can be paginated with limit and cursor
     :param session: db session
     :return: a list of users
     """
+    limit, after = page_params(limit, cursor)
     repository = UserRepository(session)
     if project_id is not None:
         validate_project(current_user.id, project_id, current_user.is_superuser,
                          session=session)
         users = repository.fetch_by_project(project_id)
         return [user_response(user) for user in users]
-    return repository.fetch_all()
+    users = repository.fetch_all(limit, after)
+    if limit is not None:
+        return page_response(users, User, limit)
+    return users
 
 
 @router.post('/users', response_model=User)
-def create_user(user_in: UserAuth, session: Session = Depends(get_db)):
-    repository = UserRepository(session)
-    user = repository.fetch_by_username(user_in.username)
+async def create_user(user_in: UserAuth, database: Database = Depends(get_async_db)):
+    repository = AsyncUserRepository(database)
+    user = await repository.fetch_by_username(user_in.username)
     if user is not None:
         raise HTTPException(
             status_code=400,
             detail='Пользователь с таким именем уже существует'
         )
-    return repository.create_user(user_in)
+    hashed_password = await hash_password(user_in.password)
+    return dict(await repository.create(user_in.username, hashed_password))
 
 
 @router.get('/current_user', response_model=User)
@@ -56,6 +65,5 @@ def current_user(
 ):
     if project_id is None:
         return user
-    ap_repo = AccessibleProjectRepository(session)
-    role = ap_repo.fetch_user_role(user.id, project_id)
-    return User(role=role, **ap_repo.__dict__)
+    role = get_project_authorization(session, user.id).role(project_id)
+    return User(role=role.value if role is not None else None, **user.__dict__)
@@ -6,6 +6,8 @@ API_V1_PREFIX = '/api/v1'
 SECRET_KEY = os.getenvb(b'SECRET_KEY', b'LMAO_SECRETS_ARE_NOT_WELCOME_ERE')
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 8  # 60 minutes * 24 hours * 8 days = 8 days
+# tokens carry the user's flags and project roles, a stale token must be refreshed
+ACCESS_TOKEN_CLAIMS = os.getenv('ACCESS_TOKEN_CLAIMS', 'false').lower() in ('1', 'true', 'yes')
 
 POSTGRES_SERVER = os.getenv('POSTGRES_SERVER', 'localhost')
 POSTGRES_USER = os.getenv('POSTGRES_USER', 'postgres')
@@ -17,3 +19,32 @@ SQLALCHEMY_DATABASE_URI = (
 
 FIRST_SUPERUSER = os.getenv('FIRST_SUPERUSER', 'admin')
 FIRST_SUPERUSER_PASSWORD = os.getenv('FIRST_SUPERUSER_PASSWORD', '123456')
+
+PASSWORD_HASH_ROUNDS = int(os.getenv('PASSWORD_HASH_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 64))
+
+ROLE_CACHE_SIZE = int(os.getenv('ROLE_CACHE_SIZE', 10000))
+ROLE_CACHE_TTL = float(os.getenv('ROLE_CACHE_TTL', 300))
+
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 30))
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = float(os.getenv('TOKEN_CACHE_TTL', 300))
+ONGOING_SPRINT_CACHE_SIZE = int(os.getenv('ONGOING_SPRINT_CACHE_SIZE', 10000))
+ONGOING_SPRINT_CACHE_TTL = float(os.getenv('ONGOING_SPRINT_CACHE_TTL', 300))
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+SESSION_LEAK_THRESHOLD = float(os.getenv('SESSION_LEAK_THRESHOLD', 10))
+# a transaction per request, committed when the response is successful, GET requests are read-only
+UNIT_OF_WORK = os.getenv('UNIT_OF_WORK', 'false').lower() in ('1', 'true', 'yes')
+
+DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', 100))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 1000))
+
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 500))
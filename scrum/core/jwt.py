@@ -1,4 +1,5 @@
 from datetime import timedelta, datetime
+from typing import Dict, List
 
 import jwt
 
@@ -22,3 +23,22 @@ def create_access_token(*, data: dict, expires_delta: timedelta = None):
     to_encode.update({'exp': expire, 'sub': TOKEN_SUBJECT})
     encoded_jwt = jwt.encode(to_encode, config.SECRET_KEY, algorithm=TOKEN_ALGORITHM)
     return encoded_jwt
+
+
+def access_claims(*, is_active: bool, is_superuser: bool, access_version: int,
+                  roles: Dict[int, str]) -> dict:
+    """
+    Claims, which let a token be authorized without the database
+    :param access_version: user's access version, the token is stale when it's bumped
+    :param roles: a map of project's id to user's role in it
+    :return: claims with the roles grouped as role -> ids of the projects
+    """
+    grouped: Dict[str, List[int]] = {}
+    for project_id, role in sorted(roles.items()):
+        grouped.setdefault(role, []).append(project_id)
+    return {
+        'is_active': is_active,
+        'is_superuser': is_superuser,
+        'access_version': access_version,
+        'roles': grouped,
+    }
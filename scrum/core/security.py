@@ -1,8 +1,24 @@
-from passlib.hash import bcrypt
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from scrum.core import config
+
+# hashes with less rounds than configured are flagged for an update, they are upgraded at login
+pwd_context = CryptContext(
+    schemes=['bcrypt'],
+    bcrypt__default_rounds=config.PASSWORD_HASH_ROUNDS,
+    bcrypt__min_rounds=config.PASSWORD_HASH_ROUNDS,
+)
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.verify(plain, hashed)
+    return pwd_context.verify(plain, hashed)
 
 
 def get_password_hash(plain_password: str) -> str:
@@ -11,4 +27,84 @@ def get_password_hash(plain_password: str) -> str:
     :param plain_password: password as text
     :return: hashed password
     """
-    return bcrypt.hash(plain_password)
\ No newline at end of file
+    return pwd_context.hash(plain_password)
+
+
+def verify_and_update(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify user's password and rehash it, if its hash is outdated
+    :return: if the password is valid and the new hash or None
+    """
+    return pwd_context.verify_and_update(plain, hashed)
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised when the password hasher's queue is full or its workers keep crashing
+    """
+
+
+class PasswordHasher(object):
+    """
+    Runs bcrypt on a dedicated process pool, so hashing neither blocks the event loop
+    nor takes the threads shared by the sync endpoints. At most workers + queue_size
+    passwords are being hashed or wait for a worker, the rest are rejected
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    async def hash(self, plain_password: str) -> str:
+        return await self._run(get_password_hash, plain_password)
+
+    async def verify_and_update(self, plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(verify_and_update, plain, hashed)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        # a killed worker breaks the pool, it's replaced and the call is retried once
+        for _ in range(2):
+            if not self._slots.acquire(blocking=False):
+                raise PasswordHasherBusy()
+            executor = self._get_executor()
+            try:
+                future = executor.submit(func, *args)
+            except BrokenProcessPool:
+                self._slots.release()
+                self._discard(executor)
+                continue
+            # the slot is held until the worker is done, even if the waiting request is cancelled
+            future.add_done_callback(self._release_slot)
+            try:
+                return await asyncio.wrap_future(future)
+            except BrokenProcessPool:
+                self._discard(executor)
+        raise PasswordHasherBusy()
+
+    def _release_slot(self, future: Future) -> None:
+        self._slots.release()
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # workers are spawned, so they don't inherit the event loop and the connections
+                self._executor = ProcessPoolExecutor(self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+
+password_hasher = PasswordHasher(config.PASSWORD_HASH_WORKERS, config.PASSWORD_HASH_QUEUE_SIZE)
@@ -0,0 +1,13 @@
+from asyncpg import PostgresError
+from databases import Database
+
+from scrum.core import config
+
+database = Database(
+    config.SQLALCHEMY_DATABASE_URI,
+    min_size=config.DB_POOL_SIZE,
+    max_size=config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW,
+    max_inactive_connection_lifetime=config.DB_POOL_RECYCLE,
+)
+# errors, which can be raised by the async database layer
+database_errors = (PostgresError, OSError)
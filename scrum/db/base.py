@@ -5,4 +5,5 @@ from scrum.db_models.user import User
 from scrum.db_models.project import Project
 from scrum.db_models.accessible_project import AccessibleProject
 from scrum.db_models.sprint import Sprint
-from scrum.db_models.task import Task
\ No newline at end of file
+from scrum.db_models.task import Task
+from scrum.db_models.burndown_snapshot import BurndownSnapshot
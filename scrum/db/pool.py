@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from typing import Dict, Any, List
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from scrum.core import config
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    A QueuePool, which counts checkouts, time spent waiting for a connection and timeouts.
+    It also logs connections held for longer than SESSION_LEAK_THRESHOLD. The held connections
+    are checked on every checkout, so a connection, which is never returned, is logged too
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self._checked_out_at = {}
+        self._reported_leaks = set()
+
+    def _do_get(self):
+        started_at = time.monotonic()
+        try:
+            record = super()._do_get()
+            with self._stats_lock:
+                self._checked_out_at[record] = time.monotonic()
+            return record
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.monotonic() - started_at
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_time += waited
+                self.max_wait_time = max(self.max_wait_time, waited)
+                # leaked connections are found by the checkouts, the timed out ones too
+                leaks = self._find_leaks()
+            for held in leaks:
+                logger.warning('A pooled connection has been held for %.2fs and may be leaked', held)
+
+    def _do_return_conn(self, conn):
+        with self._stats_lock:
+            checked_out_at = self._checked_out_at.pop(conn, None)
+            self._reported_leaks.discard(conn)
+        if checked_out_at is not None:
+            held = time.monotonic() - checked_out_at
+            if held > config.SESSION_LEAK_THRESHOLD:
+                logger.warning('A pooled connection was held for %.2fs', held)
+        super()._do_return_conn(conn)
+
+    def _find_leaks(self) -> List[float]:
+        """
+        Find connections held for longer than SESSION_LEAK_THRESHOLD, which weren't reported yet,
+        must be called with the stats lock
+        :return: how long the connections have been held
+        """
+        now = time.monotonic()
+        leaks = []
+        for record, checked_out_at in self._checked_out_at.items():
+            held = now - checked_out_at
+            if held > config.SESSION_LEAK_THRESHOLD and record not in self._reported_leaks:
+                self._reported_leaks.add(record)
+                leaks.append(held)
+        return leaks
+
+    def held_longest(self) -> float:
+        """
+        How long the oldest of currently checked out connections has been held
+        """
+        now = time.monotonic()
+        with self._stats_lock:
+            return max((now - at for at in self._checked_out_at.values()), default=0.0)
+
+    def recreate(self):
+        pool = super().recreate()
+        # QueuePool.recreate doesn't carry pre-ping over to the new pool
+        pool._pre_ping = self._pre_ping
+        return pool
+
+    def stats(self) -> Dict[str, Any]:
+        held_longest = self.held_longest()
+        with self._stats_lock:
+            return {
+                'size': self.size(),
+                'checked_in': self.checkedin(),
+                'checked_out': self.checkedout(),
+                'overflow': self.overflow(),
+                'max_overflow': self._max_overflow,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_time_total': round(self.wait_time, 6),
+                'wait_time_max': round(self.max_wait_time, 6),
+                'held_longest': round(held_longest, 6),
+            }
@@ -2,9 +2,19 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import scoped_session, sessionmaker
 
 from scrum.core import config
+from scrum.db.pool import InstrumentedQueuePool
 
-engine = create_engine(config.SQLALCHEMY_DATABASE_URI)
+engine = create_engine(
+    config.SQLALCHEMY_DATABASE_URI,
+    poolclass=InstrumentedQueuePool,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    pool_recycle=config.DB_POOL_RECYCLE,
+    pool_pre_ping=config.DB_POOL_PRE_PING,
+)
 db_session = scoped_session(
     sessionmaker(autocommit=False, autoflush=False, bind=engine)
 )
-Session = sessionmaker(autocommit=True, autoflush=False, bind=engine)
+# objects keep their state after a commit, the values are already known or returned by the writes
+Session = sessionmaker(autocommit=True, autoflush=False, expire_on_commit=False, bind=engine)
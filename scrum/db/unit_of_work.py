@@ -0,0 +1,49 @@
+from typing import Any, Callable
+
+from sqlalchemy import event, orm
+
+# keys of the session's info dict
+READ_ONLY_KEY = 'read_only'
+AFTER_COMMIT_KEY = 'after_commit'
+
+
+def begin_unit_of_work(session: orm.Session, read_only: bool = False) -> None:
+    """
+    Begin the request's transaction, the repositories' transactions become its subtransactions,
+    so the request's writes are committed together. A connection is checked out by the first query
+    :param read_only: the transaction can't write, Postgres runs it without taking a transaction id
+    """
+    session.begin()
+    session.info[READ_ONLY_KEY] = read_only
+
+
+def is_read_only(session: orm.Session) -> bool:
+    return session.info.get(READ_ONLY_KEY, False)
+
+
+def on_commit(session: orm.Session, func: Callable, *args: Any) -> None:
+    """
+    Call the function after the session's outermost transaction is committed, right away if there's
+    no transaction. Caches are invalidated with it, so they can't be refilled with uncommitted data
+    """
+    if session is None or session.transaction is None:
+        func(*args)
+    else:
+        session.info.setdefault(AFTER_COMMIT_KEY, []).append((func, args))
+
+
+@event.listens_for(orm.Session, 'after_begin')
+def _set_read_only(session: orm.Session, transaction, connection) -> None:
+    if is_read_only(session) and connection.dialect.name == 'postgresql':
+        connection.execute('SET TRANSACTION READ ONLY')
+
+
+@event.listens_for(orm.Session, 'after_commit')
+def _run_after_commit(session: orm.Session) -> None:
+    for func, args in session.info.pop(AFTER_COMMIT_KEY, []):
+        func(*args)
+
+
+@event.listens_for(orm.Session, 'after_rollback')
+def _discard_after_commit(session: orm.Session) -> None:
+    session.info.pop(AFTER_COMMIT_KEY, None)
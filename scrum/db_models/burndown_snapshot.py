@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date
+
+from scrum.db.base_class import Base
+
+
+class BurndownSnapshot(Base):
+    """
+    Weight of sprint's tasks, which were done on the day
+    """
+    __tablename__ = 'burndown_snapshots'
+
+    sprint_id = Column(Integer, ForeignKey('sprints.id', ondelete='CASCADE'), primary_key=True)
+    day = Column(Date, primary_key=True)
+    done_weight = Column(Integer, nullable=False, default=0)
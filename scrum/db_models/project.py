@@ -21,6 +21,8 @@ class Project(Base):
     tags = relationship('Tag', cascade='save-update, delete')
     tasks = relationship('Task', cascade='save-update, delete')
     sprints = relationship('Sprint', cascade='save-update, delete')
+    # bumped when the project or its tags change, ETags of the project's reads are derived from it
+    version = Column(Integer, nullable=False, default=1, server_default='1')
 
     def __init__(self, creator_id: int, **kwargs):
         super().__init__(**kwargs)
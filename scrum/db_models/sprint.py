@@ -10,10 +10,16 @@ class Sprint(Base):
     __tablename__ = 'sprints'
 
     id = Column(Integer, primary_key=True)
+    # sprints of a project can't intersect, the dates are guarded by the sprints_dates_excl
+    # exclusion constraint, which is created by a migration
     start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=False)
     project_id = Column(Integer, ForeignKey('projects.id'), index=True, nullable=False)
+    # total weight of sprint's tasks for the burndown chart, NULL until the chart is built
+    total_weight = Column(Integer, nullable=True)
     tasks = relationship('Task')
+    # bumped when the sprint's tasks change, the board's ETag is derived from it
+    version = Column(Integer, nullable=False, default=1, server_default='1')
 
     def __init__(self, *, length: int, start_date: dt.date = None, project_id: int = None, **kwargs):
         super().__init__(**kwargs)
@@ -12,3 +12,5 @@ class User(Base):
     full_name = Column(String(100))
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    # bumped when the user's flags or project roles change, tokens stamped with an older one are stale
+    access_version = Column(Integer, nullable=False, default=1, server_default='1')
@@ -0,0 +1,136 @@
+"""
+Compact read models of the hot GET endpoints. They are built from Core rows without the ORM
+and serialized with the API's aliases without pydantic's validation,
+to_json() output matches the corresponding response model's JSON
+"""
+import datetime as dt
+from typing import List, Optional
+
+from scrum.db_models.task_state import TaskState
+
+
+class UserRow(object):
+    __slots__ = ('id', 'username', 'full_name', 'is_active', 'is_superuser')
+
+    def __init__(self, id: int, username: str, full_name: Optional[str],
+                 is_active: bool, is_superuser: bool):
+        self.id = id
+        self.username = username
+        self.full_name = full_name
+        self.is_active = is_active
+        self.is_superuser = is_superuser
+
+    def to_json(self) -> dict:
+        return {
+            'username': self.username,
+            'id': self.id,
+            'fullName': self.full_name,
+            'isActive': self.is_active,
+            'isSuperuser': self.is_superuser,
+            'role': None
+        }
+
+
+class TagRow(object):
+    __slots__ = ('id', 'name', 'color', 'project_id')
+
+    def __init__(self, id: int, name: str, color: Optional[str], project_id: int):
+        self.id = id
+        self.name = name
+        self.color = color
+        self.project_id = project_id
+
+    def to_json(self) -> dict:
+        return {
+            'name': self.name,
+            'color': self.color,
+            'projectId': self.project_id,
+            'id': self.id
+        }
+
+
+class TaskRow(object):
+    __slots__ = ('id', 'name', 'description', 'project_id', 'priority', 'weight', 'created_at',
+                 'sprint_id', 'creator_id', 'assignee_id', 'state', 'creator', 'assignee', 'tags')
+
+    def __init__(self, id: int, name: str, description: Optional[str], project_id: int,
+                 priority: int, weight: int, created_at: dt.datetime, sprint_id: Optional[int],
+                 creator_id: int, assignee_id: Optional[int], state: Optional[TaskState], *,
+                 creator: UserRow, assignee: Optional[UserRow]):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.project_id = project_id
+        self.priority = priority
+        self.weight = weight
+        self.created_at = created_at
+        self.sprint_id = sprint_id
+        self.creator_id = creator_id
+        self.assignee_id = assignee_id
+        self.state = state
+        self.creator = creator
+        self.assignee = assignee
+        self.tags: List[TagRow] = []
+
+    def to_json(self) -> dict:
+        return {
+            'name': self.name,
+            'projectId': self.project_id,
+            'priority': self.priority,
+            'weight': self.weight,
+            'description': self.description,
+            'id': self.id,
+            'createdAt': self.created_at.isoformat(),
+            'sprintId': self.sprint_id,
+            'creatorId': self.creator_id,
+            'assigneeId': self.assignee_id,
+            'state': self.state.value if self.state is not None else None,
+            'assignee': self.assignee.to_json() if self.assignee is not None else None,
+            'creator': self.creator.to_json(),
+            'tags': [tag.to_json() for tag in self.tags]
+        }
+
+
+class SprintRow(object):
+    __slots__ = ('id', 'start_date', 'end_date', 'project_id', 'tasks')
+
+    def __init__(self, id: int, start_date: dt.date, end_date: dt.date, project_id: int):
+        self.id = id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.project_id = project_id
+        self.tasks: List[TaskRow] = []
+
+    def to_json(self) -> dict:
+        return {
+            'startDate': self.start_date.isoformat(),
+            'projectId': self.project_id,
+            'id': self.id,
+            'endDate': self.end_date.isoformat(),
+            'tasks': [task.to_json() for task in self.tasks]
+        }
+
+
+class ProjectRow(object):
+    __slots__ = ('id', 'name', 'description', 'color', 'sprint_length', 'created_at', 'tags')
+
+    def __init__(self, id: int, name: str, description: Optional[str], color: Optional[str],
+                 sprint_length: int, created_at: dt.datetime):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.color = color
+        self.sprint_length = sprint_length
+        self.created_at = created_at
+        self.tags: List[TagRow] = []
+
+    def to_json(self) -> dict:
+        return {
+            'name': self.name,
+            'description': self.description,
+            'color': self.color,
+            'sprintLength': self.sprint_length,
+            'id': self.id,
+            'createdAt': self.created_at.isoformat(),
+            'tags': [tag.to_json() for tag in self.tags]
+        }
@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from pydantic import BaseModel
 
 
@@ -7,3 +9,8 @@ class Token(BaseModel):
 
 class TokenPayload(BaseModel):
     user_id: int = None
+    # the claims are set only in the tokens issued with ACCESS_TOKEN_CLAIMS
+    is_active: bool = None
+    is_superuser: bool = None
+    access_version: int = None
+    roles: Dict[str, List[int]] = None
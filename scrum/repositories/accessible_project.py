@@ -1,14 +1,33 @@
 import logging
-from typing import List, Optional
+from typing import List, Optional, Dict
 
+from databases import Database
 from fastapi import HTTPException
-from sqlalchemy import exc
+from sqlalchemy import exc, select
 from sqlalchemy.orm import Session
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
-from scrum.db_models.accessible_project import AccessibleProject
+from scrum.core import config
+from scrum.core.cache import TTLCache
+from scrum.db.async_session import database_errors
+from scrum.db.unit_of_work import on_commit
+from scrum.db_models.accessible_project import AccessibleProject, Roles
+from scrum.repositories.users import invalidate_user
+from scrum.repositories.versions import VersionRepository
 
 logger = logging.getLogger(__name__)
+# user's id -> {project's id: role}, shared between requests
+role_cache = TTLCache(config.ROLE_CACHE_SIZE, config.ROLE_CACHE_TTL)
+
+
+def invalidate_roles(*user_ids: int) -> None:
+    """
+    Drop cached roles of the users, must be called by every write to accessible projects.
+    The cached users are dropped too, their access versions are bumped by the writes
+    """
+    for user_id in user_ids:
+        role_cache.invalidate(user_id)
+        invalidate_user(user_id)
 
 
 class AccessibleProjectRepository(object):
@@ -28,6 +47,28 @@ class AccessibleProjectRepository(object):
             accessible = accessible.filter_by(role='owner')
         return [row.project_id for row in accessible.all()]
 
+    def fetch_roles_for_user(self, user_id: int) -> Dict[int, Roles]:
+        """
+        Fetch all user's roles in a single query, or from the cache
+        :param user_id: user's id
+        :return: a map of project's id to user's role in it
+        """
+        roles = role_cache.get(user_id)
+        if roles is not None:
+            return dict(roles)
+        try:
+            rows = self.session.query(AccessibleProject.project_id, AccessibleProject.role)\
+                .filter_by(user_id=user_id).all()
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
+            raise HTTPException(
+                status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+                detail='Внутренняя ошибка сервера'
+            )
+        roles = {project_id: role for project_id, role in rows}
+        role_cache.set(user_id, roles)
+        return dict(roles)
+
     def fetch_user_role(self, user_id: int, project_id: int) -> Optional[str]:
         try:
             ap: AccessibleProject = self.session.query(AccessibleProject)\
@@ -43,13 +84,15 @@ class AccessibleProjectRepository(object):
             )
 
     def delete(self, project_id: int, user_id: int) -> None:
-        self.session.begin()
+        self.session.begin(subtransactions=True)
         try:
             ap = self.session.query(AccessibleProject)\
                 .filter_by(project_id=project_id, user_id=user_id).first()
             if ap is not None:
                 self.session.delete(ap)
+                VersionRepository(self.session).bump_users([user_id])
                 self.session.commit()
+                on_commit(self.session, invalidate_roles, user_id)
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
@@ -57,3 +100,26 @@ class AccessibleProjectRepository(object):
                 status_code=HTTP_500_INTERNAL_SERVER_ERROR,
                 detail='Внутренняя ошибка сервера'
             )
+
+
+class AsyncAccessibleProjectRepository(object):
+    def __init__(self, database: Database):
+        self.database = database
+
+    async def fetch_roles_for_user(self, user_id: int) -> Dict[int, Roles]:
+        roles = role_cache.get(user_id)
+        if roles is not None:
+            return dict(roles)
+        table = AccessibleProject.__table__
+        query = select([table.c.project_id, table.c.role]).where(table.c.user_id == user_id)
+        try:
+            rows = await self.database.fetch_all(query)
+        except database_errors as e:
+            logger.error(e)
+            raise HTTPException(
+                status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+                detail='Внутренняя ошибка сервера'
+            )
+        roles = {row['project_id']: row['role'] for row in rows}
+        role_cache.set(user_id, roles)
+        return dict(roles)
@@ -0,0 +1,113 @@
+import datetime as dt
+import logging
+from collections import defaultdict
+from typing import Dict, Tuple, Iterable
+
+from fastapi import HTTPException
+from sqlalchemy import exc, case, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
+
+from scrum.db.unit_of_work import is_read_only
+from scrum.db_models.burndown_snapshot import BurndownSnapshot
+from scrum.db_models.sprint import Sprint as DBSprint
+from scrum.db_models.task import Task as DBTask
+from scrum.db_models.task_state import TaskState
+
+internal_error = HTTPException(
+    status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+    detail='Внутренняя ошибка сервера'
+)
+logger = logging.getLogger(__name__)
+
+
+class BurndownRepository(object):
+    """
+    Per-sprint burndown snapshots: sprint's total weight and weight done on each day.
+    Writes to tasks keep them up to date with the add_* methods, which must be called
+    inside of the writer's transaction
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def fetch(self, sprint: DBSprint) -> Tuple[int, Dict[dt.date, int]]:
+        """
+        Fetch sprint's burndown, building the snapshot on the first call
+        :return: total weight and a map of a day to the weight done on it
+        """
+        if sprint.total_weight is None:
+            return self.rebuild(sprint)
+        try:
+            rows = self.session.query(BurndownSnapshot.day, BurndownSnapshot.done_weight)\
+                .filter_by(sprint_id=sprint.id).all()
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
+            raise internal_error
+        return sprint.total_weight, {day: weight for day, weight in rows if weight}
+
+    def fetch_done_weight_by_day(self, sprint_id: int) -> Tuple[int, Dict[dt.date, int]]:
+        """
+        Aggregate weight of sprint's tasks in the database with a single GROUP BY query
+        :param sprint_id: sprint's id
+        :return: total weight and a map of a day to the weight of tasks done on it
+        """
+        day = case([(DBTask.state == TaskState.done, DBTask.done_date)])
+        try:
+            rows = self.session.query(day, func.coalesce(func.sum(DBTask.weight), 0))\
+                .filter(DBTask.sprint_id == sprint_id)\
+                .group_by(day).all()
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
+            raise internal_error
+        total_weight = sum(weight for _, weight in rows)
+        return total_weight, {day: weight for day, weight in rows if day is not None and weight}
+
+    def rebuild(self, sprint: DBSprint) -> Tuple[int, Dict[dt.date, int]]:
+        total_weight, done = self.fetch_done_weight_by_day(sprint.id)
+        if is_read_only(self.session):
+            # a read-only unit of work can't store the snapshot, the chart is computed from the tasks
+            return total_weight, done
+        self.session.begin(subtransactions=True)
+        try:
+            self.session.query(BurndownSnapshot).filter_by(sprint_id=sprint.id)\
+                .delete(synchronize_session=False)
+            if done:
+                self.session.bulk_insert_mappings(BurndownSnapshot, [
+                    {'sprint_id': sprint.id, 'day': day, 'done_weight': weight}
+                    for day, weight in done.items()
+                ])
+            sprint.total_weight = total_weight
+            self.session.commit()
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
+            self.session.rollback()
+            raise internal_error
+        return total_weight, done
+
+    def add_total(self, sprint_id: int, delta: int) -> None:
+        if not delta:
+            return
+        self.session.query(DBSprint)\
+            .filter(DBSprint.id == sprint_id, DBSprint.total_weight.isnot(None))\
+            .update({DBSprint.total_weight: DBSprint.total_weight + delta},
+                    synchronize_session=False)
+
+    def add_done(self, deltas: Iterable[Tuple[int, dt.date, int]]) -> None:
+        """
+        Add weight done on the days
+        :param deltas: sprint's id, day and weight triples, weight may be negative
+        """
+        merged = defaultdict(int)
+        for sprint_id, day, delta in deltas:
+            merged[(sprint_id, day)] += delta
+        values = [{'sprint_id': sprint_id, 'day': day, 'done_weight': delta}
+                  for (sprint_id, day), delta in merged.items() if delta]
+        if not values:
+            return
+        stmt = insert(BurndownSnapshot.__table__).values(values)
+        self.session.execute(stmt.on_conflict_do_update(
+            index_elements=[BurndownSnapshot.sprint_id, BurndownSnapshot.day],
+            set_={'done_weight': BurndownSnapshot.done_weight + stmt.excluded.done_weight}
+        ))
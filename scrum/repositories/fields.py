@@ -0,0 +1,28 @@
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+
+def load_fields(entity: type, fields: Optional[Set[str]], relations: Dict[str, List[Any]]) -> List[Any]:
+    """
+    Loader options for a sparse fieldset: only the requested columns are selected
+    and only the requested relationships are eager loaded
+    :param entity: mapped class
+    :param fields: names of the requested attributes, None for all of them
+    :param relations: eager loader options of the entity's relationships by their names
+    """
+    if fields is None:
+        return [option for options in relations.values() for option in options]
+    mapper = inspect(entity)
+    columns = {column.key for column in mapper.primary_key}
+    options = []
+    for name in fields:
+        if name in mapper.relationships:
+            # the relationship is loaded by its local columns, e.g. the foreign key
+            columns.update(column.key for column in mapper.relationships[name].local_columns)
+            if name in relations:
+                options.extend(relations[name])
+        elif name in mapper.column_attrs:
+            columns.add(name)
+    return [load_only(*columns)] + options
@@ -0,0 +1,23 @@
+from typing import Optional
+
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import Select, ColumnElement
+
+
+def keyset(query: Query, key: ColumnElement, limit: Optional[int], after: Optional[int]) -> Query:
+    """
+    Limit the query to a page, which starts right after the key's value.
+    Works both for ORM queries and Core selects
+    :param query: query to paginate
+    :param key: unique indexed column, which orders the pages
+    :param limit: size of the page, None for all rows
+    :param after: key's value of the previous page's last row
+    """
+    if limit is None and after is None:
+        return query
+    query = query.order_by(key)
+    if after is not None:
+        query = query.where(key > after) if isinstance(query, Select) else query.filter(key > after)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
@@ -1,15 +1,25 @@
 import logging
-from typing import List, Optional
+from typing import List, Optional, Set
 
+from databases import Database
 from fastapi import HTTPException
-from sqlalchemy import or_, exc
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, exc, select
+from sqlalchemy.orm import Session, selectinload
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
+from scrum.db.async_session import database_errors
+from scrum.db.unit_of_work import on_commit
 from scrum.db_models.accessible_project import AccessibleProject
 from scrum.db_models.project import Project as DBProject
+from scrum.db_models.tag import Tag as DBTag
 from scrum.db_models.user import User as DBUser
 from scrum.models.project import ProjectCreate, Project
+from scrum.models.rows import ProjectRow, TagRow
+from scrum.repositories.accessible_project import invalidate_roles
+from scrum.repositories.fields import load_fields
+from scrum.repositories.pagination import keyset
+from scrum.repositories.tags import tag_columns
+from scrum.repositories.versions import VersionRepository
 
 commit_exception = HTTPException(
     status_code=HTTP_500_INTERNAL_SERVER_ERROR,
@@ -22,24 +32,31 @@ class ProjectRepository(object):
     def __init__(self, session: Session):
         self.session = session
 
-    def fetch_all(self, accessible_projects: List[int], is_superuser: bool) -> List[DBProject]:
+    def fetch_all(self, accessible_projects: List[int], is_superuser: bool,
+                  limit: int = None, after: int = None, fields: Set[str] = None) -> List[DBProject]:
         try:
-            if is_superuser:
-                return self.session.query(DBProject).all()
-            else:
-                return self.session.query(DBProject).\
-                    filter(or_(DBProject.id.in_(accessible_projects), is_superuser)).all()
+            query = self.session.query(DBProject).options(*self._load_options(fields))
+            if not is_superuser:
+                query = query.filter(or_(DBProject.id.in_(accessible_projects), is_superuser))
+            return keyset(query, DBProject.id, limit, after).all()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             raise commit_exception
 
-    def fetch(self, project_id: int) -> Optional[DBProject]:
+    def fetch(self, project_id: int, fields: Set[str] = None) -> Optional[DBProject]:
+        query = self.session.query(DBProject)
+        if fields is not None:
+            query = query.options(*self._load_options(fields))
         try:
-            return self.session.query(DBProject).get(project_id)
+            return query.get(project_id)
         except exc.SQLAlchemyError as e:
             logger.error(e)
             raise commit_exception
 
+    @staticmethod
+    def _load_options(fields: Optional[Set[str]]) -> list:
+        return load_fields(DBProject, fields, {'tags': [selectinload(DBProject.tags)]})
+
     def check_name(self, project_name: str) -> Optional[DBProject]:
         try:
             return self.session.query(DBProject).filter_by(name=project_name).first()
@@ -51,49 +68,111 @@ class ProjectRepository(object):
         new_project = DBProject(creator_id, name=user_data.name,
                                 description=user_data.description,
                                 color=user_data.color)
-        self.session.begin()
+        self.session.begin(subtransactions=True)
         self.session.add(new_project)
         try:
+            VersionRepository(self.session).bump_users([creator_id])
             self.session.commit()
-            self.session.refresh(new_project)
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
             raise commit_exception
+        on_commit(self.session, invalidate_roles, creator_id)
         return new_project
 
     def delete(self, project: DBProject) -> None:
-        self.session.begin()
+        user_ids = [ap.user_id for ap in project.users]
+        self.session.begin(subtransactions=True)
         self.session.delete(project)
         try:
+            VersionRepository(self.session).bump_users(user_ids)
             self.session.commit()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
             raise commit_exception
+        on_commit(self.session, invalidate_roles, *user_ids)
 
     def give_access(self, project: DBProject, user: DBUser) -> None:
-        self.session.begin()
+        self.session.begin(subtransactions=True)
         ap = AccessibleProject(project_id=project.id, user_id=user.id, role='dev')
         project.users.append(ap)
         try:
+            VersionRepository(self.session).bump_users([user.id])
             self.session.commit()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
             raise commit_exception
+        on_commit(self.session, invalidate_roles, user.id)
 
     def update(self, project: DBProject, project_in: Project) -> DBProject:
-        self.session.begin()
+        self.session.begin(subtransactions=True)
         project.name = project_in.name
         project.description = project.description
         project.sprint_length = project_in.sprint_length
         project.color = project_in.color
         try:
+            VersionRepository(self.session).bump_project(project.id)
             self.session.commit()
-            self.session.refresh(project)
             return project
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
             raise commit_exception
+
+
+class ProjectRowRepository(object):
+    """
+    Reads projects with Core selects into ProjectRow, the projects aren't tracked by the session.
+    Tags are read with a second SELECT
+    """
+    projects = DBProject.__table__
+    # the columns are in the order of ProjectRow's arguments
+    columns = [projects.c.id, projects.c.name, projects.c.description, projects.c.color,
+               projects.c.sprint_length, projects.c.created_at]
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def fetch_all(self, project_ids: List[int] = None,
+                  limit: int = None, after: int = None) -> List[ProjectRow]:
+        """
+        :param project_ids: ids of the projects, None for all projects
+        """
+        query = select(self.columns)
+        if project_ids is not None:
+            query = query.where(self.projects.c.id.in_(project_ids))
+        return self._fetch(keyset(query, self.projects.c.id, limit, after))
+
+    def fetch(self, project_id: int) -> Optional[ProjectRow]:
+        projects = self._fetch(select(self.columns).where(self.projects.c.id == project_id))
+        return projects[0] if projects else None
+
+    def _fetch(self, query) -> List[ProjectRow]:
+        try:
+            projects = [ProjectRow(*row) for row in self.session.execute(query)]
+            if projects:
+                by_id = {project.id: project for project in projects}
+                tags = select(tag_columns).where(DBTag.__table__.c.project_id.in_(list(by_id)))
+                for row in self.session.execute(tags):
+                    tag = TagRow(*row)
+                    by_id[tag.project_id].tags.append(tag)
+            return projects
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
+            raise commit_exception
+
+
+class AsyncProjectRepository(object):
+    def __init__(self, database: Database):
+        self.database = database
+
+    async def fetch(self, project_id: int) -> Optional[dict]:
+        table = DBProject.__table__
+        try:
+            row = await self.database.fetch_one(table.select().where(table.c.id == project_id))
+        except database_errors as e:
+            logger.error(e)
+            raise commit_exception
+        return dict(row) if row is not None else None
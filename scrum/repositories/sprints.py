@@ -1,62 +1,117 @@
 import datetime as dt
 import logging
-from typing import List, Optional
+from typing import List, Optional, Tuple, Set
 
 from fastapi import HTTPException
-from sqlalchemy import exc
-from sqlalchemy.orm import Session
-from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
+from sqlalchemy import exc, select, func, literal
+from sqlalchemy.orm import Session, selectinload
+from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR, HTTP_400_BAD_REQUEST
 
+from scrum.core import config
+from scrum.core.cache import TTLCache, MISSING
+from scrum.db.unit_of_work import on_commit
 from scrum.db_models.sprint import Sprint as DBSprint
 from scrum.db_models.task import Task as DBTask
 from scrum.db_models.task_state import TaskState
+from scrum.models.rows import SprintRow
 from scrum.models.sprint import SprintCreate
+from scrum.repositories.burndown import BurndownRepository
+from scrum.repositories.fields import load_fields
+from scrum.repositories.pagination import keyset
+from scrum.repositories.tasks import TaskRowRepository
+from scrum.repositories.versions import VersionRepository
 
 internal_error = HTTPException(
     status_code=HTTP_500_INTERNAL_SERVER_ERROR,
     detail='Внутренняя ошибка сервера'
 )
+sprint_intersects = HTTPException(
+    status_code=HTTP_400_BAD_REQUEST,
+    detail='Для такой даты начала спринта существует пересекающийся спринт'
+)
 logger = logging.getLogger(__name__)
+# SQLSTATE of the exclusion constraint's violation, sprints of a project can't intersect
+EXCLUSION_VIOLATION = '23P01'
+# (project's id, date) -> id of the project's sprint ongoing at the date or None, shared between requests
+ongoing_cache = TTLCache(config.ONGOING_SPRINT_CACHE_SIZE, config.ONGOING_SPRINT_CACHE_TTL)
+
+
+def invalidate_ongoing(project_id: int) -> None:
+    """
+    Drop the cached ongoing sprint of the project, must be called by every write to its sprints' dates.
+    Entries of the previous days are never read again, so the cache rolls over at midnight
+    """
+    ongoing_cache.invalidate((project_id, dt.date.today()))
+
+
+def tasks_unavailable(missing: List[int], taken: List[int]) -> HTTPException:
+    details = []
+    if missing:
+        details.append(f'Задачи с id={missing} не существуют в данном проекте')
+    if taken:
+        details.append(f'Задачи с id={taken} уже содержатся в другом спринте')
+    return HTTPException(
+        status_code=HTTP_400_BAD_REQUEST,
+        detail='. '.join(details)
+    )
 
 
 class SprintRepository(object):
     def __init__(self, session: Session):
         self.session = session
 
-    def fetch_all(self, accessible_projects: List[int], project_id: int) -> List[DBSprint]:
+    def fetch_all(self, accessible_projects: List[int], project_id: int,
+                  limit: int = None, after: int = None, with_tasks: bool = False,
+                  fields: Set[str] = None) -> List[DBSprint]:
+        """
+        :param with_tasks: eager load sprint's tasks
+        :param fields: sparse fieldset, tasks are loaded only if they are requested
+        """
         try:
+            query = self.session.query(DBSprint)
+            relations = {}
+            if with_tasks or fields is not None:
+                relations['tasks'] = self._tasks_options()
+            query = query.options(*load_fields(DBSprint, fields, relations))
             if project_id is None:
-                return self.session.query(DBSprint).\
-                    filter(DBSprint.project_id.in_(accessible_projects)).all()
+                query = query.filter(DBSprint.project_id.in_(accessible_projects))
             else:
-                return self.session.query(DBSprint).filter_by(project_id=project_id).all()
+                query = query.filter_by(project_id=project_id)
+            return keyset(query, DBSprint.id, limit, after).all()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
             raise internal_error
 
-    def fetch_by_project(self, project_id: int) -> List[DBSprint]:
-        try:
-            return self.session.query(DBSprint).filter_by(project_id=project_id).all()
-        except exc.SQLAlchemyError as e:
-            logger.error(e)
-            self.session.rollback()
-            raise internal_error
+    @staticmethod
+    def _tasks_options():
+        tasks = selectinload(DBSprint.tasks)
+        return [tasks.selectinload(DBTask.creator),
+                tasks.selectinload(DBTask.assignee),
+                tasks.selectinload(DBTask.tags)]
 
-    def fetch(self, sprint_id: int) -> Optional[DBSprint]:
+    def has_intersection(self, project_id: int, start_date: dt.date, sprint_length: int = 2) -> bool:
+        """
+        Check if a sprint with the dates would intersect any of the project's sprints,
+        the range query is a single probe of the sprints' exclusion constraint's index
+        """
+        end_date = start_date + dt.timedelta(weeks=sprint_length)
+        query = self.session.query(DBSprint.id).filter(
+            DBSprint.project_id == project_id,
+            _dates(DBSprint.start_date, DBSprint.end_date).op('&&')(_dates(start_date, end_date))
+        )
         try:
-            return self.session.query(DBSprint).get(sprint_id)
+            return self.session.query(query.exists()).scalar()
         except exc.SQLAlchemyError as e:
             logger.error(e)
-            self.session.rollback()
             raise internal_error
 
-    def fetch_ongoing(self, project_id: int) -> Optional[DBSprint]:
-        today = dt.date.today()
+    def fetch(self, sprint_id: int, fields: Set[str] = None) -> Optional[DBSprint]:
+        query = self.session.query(DBSprint)
+        if fields is not None:
+            query = query.options(*load_fields(DBSprint, fields, {'tasks': self._tasks_options()}))
         try:
-            return self.session.query(DBSprint).filter(DBSprint.project_id == project_id,
-                                                       DBSprint.start_date <= today,
-                                                       DBSprint.end_date >= today).first()
+            return query.get(sprint_id)
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
@@ -65,53 +120,176 @@ class SprintRepository(object):
     def create(self, sprint_in: SprintCreate, sprint_length: int = 2) -> DBSprint:
         sprint = DBSprint(length=sprint_length, start_date=sprint_in.start_date,
                           project_id=sprint_in.project_id)
-        self.session.begin()
-        self.session.add(sprint)
-        self.session.flush()
-        for task_id in sprint_in.tasks:
-            task_db: DBTask = self.session.query(DBTask).get(task_id)
-            task_db.sprint_id = sprint.id
-            task_db.state = TaskState.todo
+        self.session.begin(subtransactions=True)
         try:
+            self.session.add(sprint)
+            self.session.flush()
+            missing, taken = self.attach_tasks(sprint, sprint_in.tasks)
+            if missing or taken:
+                self.session.rollback()
+                raise tasks_unavailable(missing, taken)
             self.session.commit()
-            self.session.refresh(sprint)
+            self.session.expire(sprint, ['tasks'])
         except exc.SQLAlchemyError as e:
-            logger.error(e)
             self.session.rollback()
+            if _is_intersection(e):
+                raise sprint_intersects
+            logger.error(e)
             raise internal_error
+        on_commit(self.session, invalidate_ongoing, sprint.project_id)
         return sprint
 
     def delete(self, sprint: DBSprint) -> None:
-        self.session.begin()
-        for task in sprint.tasks:
-            task.state = None
+        self.session.begin(subtransactions=True)
         try:
+            # the sprint's burndown snapshot is deleted with it, so there's nothing to track
+            self.session.query(DBTask).filter(DBTask.sprint_id == sprint.id)\
+                .update({DBTask.sprint_id: None, DBTask.state: None}, synchronize_session=False)
             self.session.delete(sprint)
             self.session.commit()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
             raise internal_error
+        on_commit(self.session, invalidate_ongoing, sprint.project_id)
 
     def update(self, sprint: DBSprint, sprint_in: SprintCreate) -> DBSprint:
-        self.session.begin()
+        self.session.begin(subtransactions=True)
+        # the sprint keeps its length
+        sprint.end_date = sprint_in.start_date + (sprint.end_date - sprint.start_date)
         sprint.start_date = sprint_in.start_date
-        for task in sprint.tasks:
-            if task.id not in sprint_in.tasks:
-                task.sprint_id = None
-                task.state = None
-            else:
-                sprint_in.tasks.remove(task.id)
-        for task_id in sprint_in.tasks:
-            task_db: DBTask = self.session.query(DBTask).get(task_id)
-            if task_db is not None and task_db.sprint_id is None:
-                task_db.state = TaskState.todo
-                task_db.sprint_id = sprint.id
         try:
+            self.detach_tasks(sprint, keep=sprint_in.tasks)
+            missing, taken = self.attach_tasks(sprint, sprint_in.tasks)
+            if missing or taken:
+                self.session.rollback()
+                raise tasks_unavailable(missing, taken)
+            VersionRepository(self.session).bump_sprints([sprint.id])
             self.session.commit()
-            self.session.refresh(sprint)
+            self.session.expire(sprint, ['tasks'])
+            on_commit(self.session, invalidate_ongoing, sprint.project_id)
             return sprint
         except exc.SQLAlchemyError as e:
-            logger.error(e)
             self.session.rollback()
+            if _is_intersection(e):
+                raise sprint_intersects
+            logger.error(e)
+            raise internal_error
+
+    def attach_tasks(self, sprint: DBSprint, task_ids: List[int]) -> Tuple[List[int], List[int]]:
+        """
+        Attach the project's free tasks to the sprint with an UPDATE ... RETURNING,
+        the ids that weren't attached are then checked with a single SELECT.
+        Attached weight is added to the sprint's burndown. Must be called inside of a transaction
+        :param sprint: the sprint
+        :param task_ids: ids of the tasks, tasks which are already in the sprint are skipped
+        :return: ids of missing tasks and ids of tasks, which are taken by other sprints
+        """
+        if not task_ids:
+            return [], []
+        tasks = DBTask.__table__
+        attached = self.session.execute(
+            tasks.update()
+            .where(tasks.c.id.in_(task_ids))
+            .where(tasks.c.project_id == sprint.project_id)
+            .where(tasks.c.sprint_id.is_(None))
+            .values(sprint_id=sprint.id, state=TaskState.todo)
+            .returning(tasks.c.id, tasks.c.weight)
+        ).fetchall()
+        BurndownRepository(self.session).add_total(sprint.id, sum(row.weight or 0 for row in attached))
+        rest = set(task_ids) - {row.id for row in attached}
+        if not rest:
+            return [], []
+        found = dict(self.session.query(DBTask.id, DBTask.sprint_id)
+                     .filter(DBTask.id.in_(rest), DBTask.project_id == sprint.project_id).all())
+        missing = sorted(task_id for task_id in rest if task_id not in found)
+        taken = sorted(task_id for task_id, sprint_id in found.items() if sprint_id != sprint.id)
+        return missing, taken
+
+    def detach_tasks(self, sprint: DBSprint, keep: List[int] = None) -> None:
+        """
+        Detach sprint's tasks with a single UPDATE and remove their weight from the sprint's
+        burndown, must be called inside of a transaction
+        :param sprint: the sprint
+        :param keep: ids of the tasks, which stay in the sprint
+        """
+        query = self.session.query(DBTask).filter(DBTask.sprint_id == sprint.id)
+        if keep:
+            query = query.filter(DBTask.id.notin_(keep))
+        detached = query.with_entities(DBTask.id, DBTask.weight, DBTask.state, DBTask.done_date).all()
+        if not detached:
+            return
+        self.session.query(DBTask).filter(DBTask.id.in_([row.id for row in detached]))\
+            .update({DBTask.sprint_id: None, DBTask.state: None}, synchronize_session=False)
+        burndown_repo = BurndownRepository(self.session)
+        burndown_repo.add_total(sprint.id, -sum(row.weight or 0 for row in detached))
+        burndown_repo.add_done([(sprint.id, row.done_date, -(row.weight or 0)) for row in detached
+                                if row.state == TaskState.done and row.done_date is not None])
+
+
+def _dates(start_date, end_date):
+    """
+    Inclusive date range of a sprint, like in the exclusion constraint
+    """
+    return func.daterange(start_date, end_date, literal('[]'))
+
+
+def _is_intersection(e: exc.SQLAlchemyError) -> bool:
+    return isinstance(e, exc.IntegrityError) and getattr(e.orig, 'pgcode', None) == EXCLUSION_VIOLATION
+
+
+class SprintRowRepository(object):
+    """
+    Reads sprints with Core selects into SprintRow, the sprints aren't tracked by the session
+    """
+    sprints = DBSprint.__table__
+    # the columns are in the order of SprintRow's arguments
+    columns = [sprints.c.id, sprints.c.start_date, sprints.c.end_date, sprints.c.project_id]
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def fetch_all(self, project_ids: List[int], limit: int = None, after: int = None) -> List[SprintRow]:
+        """
+        Fetch sprints of the projects without their tasks
+        """
+        query = select(self.columns).where(self.sprints.c.project_id.in_(project_ids))
+        return self._fetch(keyset(query, self.sprints.c.id, limit, after))
+
+    def fetch(self, sprint_id: int) -> Optional[SprintRow]:
+        """
+        Fetch the sprint with its tasks
+        """
+        sprints = self._fetch(select(self.columns).where(self.sprints.c.id == sprint_id))
+        if not sprints:
+            return None
+        sprints[0].tasks = TaskRowRepository(self.session).fetch_all(sprint_id=sprint_id)
+        return sprints[0]
+
+    def fetch_ongoing(self, project_id: int) -> Optional[SprintRow]:
+        """
+        Fetch the project's sprint ongoing today with its tasks. The sprint's id is cached,
+        the tasks change often, so they are always read
+        """
+        key = (project_id, dt.date.today())
+        sprint_id = ongoing_cache.get(key, MISSING)
+        if sprint_id is MISSING:
+            today = key[1]
+            query = select([self.sprints.c.id]).where(self.sprints.c.project_id == project_id)\
+                .where(self.sprints.c.start_date <= today).where(self.sprints.c.end_date >= today)
+            try:
+                sprint_id = self.session.execute(query.limit(1)).scalar()
+            except exc.SQLAlchemyError as e:
+                logger.error(e)
+                raise internal_error
+            ongoing_cache.set(key, sprint_id)
+        if sprint_id is None:
+            return None
+        return self.fetch(sprint_id)
+
+    def _fetch(self, query) -> List[SprintRow]:
+        try:
+            return [SprintRow(*row) for row in self.session.execute(query)]
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
             raise internal_error
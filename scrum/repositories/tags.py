@@ -1,19 +1,27 @@
 import logging
 from typing import Optional, List
 
+from databases import Database
 from fastapi import HTTPException
 from sqlalchemy import exc
 from sqlalchemy.orm import Session
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
+from scrum.db.async_session import database_errors
 from scrum.db_models.tag import Tag as DBTag
+from scrum.models.rows import TagRow
 from scrum.models.tag import TagCreate, Tag
+from scrum.repositories.pagination import keyset
+from scrum.repositories.versions import VersionRepository
 
 internal_error = HTTPException(
     status_code=HTTP_500_INTERNAL_SERVER_ERROR,
     detail='Внутренняя ошибка'
 )
 logger = logging.getLogger(__name__)
+# columns of the tags in the order of TagRow's arguments
+tag_columns = [DBTag.__table__.c.id, DBTag.__table__.c.name,
+               DBTag.__table__.c.color, DBTag.__table__.c.project_id]
 
 
 class TagRepository(object):
@@ -23,11 +31,11 @@ class TagRepository(object):
     def create(self, tag_in: TagCreate) -> DBTag:
         tag = DBTag(name=tag_in.name, color=tag_in.color,
                     project_id=tag_in.project_id)
-        self.session.begin()
+        self.session.begin(subtransactions=True)
         self.session.add(tag)
         try:
+            VersionRepository(self.session).bump_project(tag.project_id)
             self.session.commit()
-            self.session.refresh(tag)
             return tag
         except exc.SQLAlchemyError as e:
             logger.error(e)
@@ -35,9 +43,10 @@ class TagRepository(object):
             raise internal_error
 
     def delete(self, tag: DBTag) -> None:
-        self.session.begin()
+        self.session.begin(subtransactions=True)
         self.session.delete(tag)
         try:
+            VersionRepository(self.session).bump_project(tag.project_id)
             self.session.commit()
         except exc.SQLAlchemyError as e:
             self.session.rollback()
@@ -51,30 +60,62 @@ class TagRepository(object):
             logger.error(e)
             raise internal_error
 
-    def fetch_accessible(self, accessible_projects: List[int]) -> List[DBTag]:
+    def fetch_accessible(self, accessible_projects: List[int],
+                         limit: int = None, after: int = None) -> List[DBTag]:
         try:
-            return self.session.query(DBTag)\
-                .filter(DBTag.project_id.in_(accessible_projects)).all()
+            query = self.session.query(DBTag).filter(DBTag.project_id.in_(accessible_projects))
+            return keyset(query, DBTag.id, limit, after).all()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             raise internal_error
 
-    def fetch_by_project(self, project_id: int) -> List[DBTag]:
+    def fetch_by_project(self, project_id: int, limit: int = None, after: int = None) -> List[DBTag]:
         try:
-            return self.session.query(DBTag).filter_by(project_id=project_id).all()
+            query = self.session.query(DBTag).filter_by(project_id=project_id)
+            return keyset(query, DBTag.id, limit, after).all()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             raise internal_error
 
     def update(self, tag: DBTag, tag_in: Tag) -> DBTag:
-        self.session.begin()
+        self.session.begin(subtransactions=True)
         tag.name = tag_in.name
         tag.color = tag_in.color
         try:
+            VersionRepository(self.session).bump_project(tag.project_id)
             self.session.commit()
-            self.session.refresh(tag)
             return tag
         except exc.SQLAlchemyError as e:
             self.session.rollback()
             logger.error(e)
             raise internal_error
+
+
+class AsyncTagRepository(object):
+    def __init__(self, database: Database):
+        self.database = database
+        self.table = DBTag.__table__
+
+    async def fetch(self, tag_id: int) -> Optional[TagRow]:
+        try:
+            row = await self.database.fetch_one(self.table.select().where(self.table.c.id == tag_id))
+        except database_errors as e:
+            logger.error(e)
+            raise internal_error
+        return TagRow(**dict(row)) if row is not None else None
+
+    async def fetch_accessible(self, accessible_projects: List[int],
+                               limit: int = None, after: int = None) -> List[TagRow]:
+        query = self.table.select().where(self.table.c.project_id.in_(accessible_projects))
+        return await self._fetch_all(keyset(query, self.table.c.id, limit, after))
+
+    async def fetch_by_project(self, project_id: int, limit: int = None, after: int = None) -> List[TagRow]:
+        query = self.table.select().where(self.table.c.project_id == project_id)
+        return await self._fetch_all(keyset(query, self.table.c.id, limit, after))
+
+    async def _fetch_all(self, query) -> List[TagRow]:
+        try:
+            return [TagRow(**dict(row)) for row in await self.database.fetch_all(query)]
+        except database_errors as e:
+            logger.error(e)
+            raise internal_error
@@ -1,16 +1,25 @@
 import datetime as dt
 import logging
-from typing import List, Optional
+from typing import Any, List, Optional, Dict, Tuple, Set
 
 from fastapi import HTTPException
-from sqlalchemy import exc
-from sqlalchemy.orm import Session
+from sqlalchemy import exc, case, literal, and_, or_, not_, null, false, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, selectinload
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
 from scrum.db_models.task import Task as DBTask, TaskState
 from scrum.db_models.tag import Tag as DBTag
+from scrum.db_models.tags_association import tags_association
+from scrum.db_models.user import User as DBUser
+from scrum.models.rows import TaskRow, UserRow, TagRow
 from scrum.models.tag import Tag
 from scrum.models.task import TaskCreate, TaskBoard, Task
+from scrum.repositories.burndown import BurndownRepository
+from scrum.repositories.fields import load_fields
+from scrum.repositories.pagination import keyset
+from scrum.repositories.tags import tag_columns
+from scrum.repositories.versions import VersionRepository
 
 internal_error = HTTPException(
     status_code=HTTP_500_INTERNAL_SERVER_ERROR,
@@ -23,41 +32,63 @@ class TaskRepository(object):
     def __init__(self, session: Session):
         self.session = session
 
-    def fetch_all(self) -> List[DBTask]:
+    def _query_with_relations(self, fields: Set[str] = None):
+        """
+        A query for tasks, which loads everything needed for the task's serialization
+        (creator, assignee and tags) in a constant number of batched SELECTs.
+        With a sparse fieldset only the requested columns and relationships are loaded
+        """
+        return self.session.query(DBTask).options(*load_fields(DBTask, fields, {
+            'creator': [selectinload(DBTask.creator)],
+            'assignee': [selectinload(DBTask.assignee)],
+            'tags': [selectinload(DBTask.tags)]
+        }))
+
+    def fetch_all(self, limit: int = None, after: int = None, fields: Set[str] = None) -> List[DBTask]:
         try:
-            return self.session.query(DBTask).all()
+            return keyset(self._query_with_relations(fields), DBTask.id, limit, after).all()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             raise internal_error
 
-    def fetch(self, task_id: int) -> Optional[DBTask]:
+    def fetch(self, task_id: int, fields: Set[str] = None) -> Optional[DBTask]:
+        query = self.session.query(DBTask) if fields is None else self._query_with_relations(fields)
         try:
-            return self.session.query(DBTask).get(task_id)
+            return query.get(task_id)
         except exc.SQLAlchemyError as e:
             logger.error(e)
             raise internal_error
 
-    def fetch_accessible(self, accessible_projects: List[int]) -> List[DBTask]:
+    def fetch_accessible(self, accessible_projects: List[int], limit: int = None,
+                         after: int = None, fields: Set[str] = None) -> List[DBTask]:
         try:
-            return self.session.query(DBTask).\
-                filter(DBTask.project_id.in_(accessible_projects)).all()
+            query = self._query_with_relations(fields).filter(DBTask.project_id.in_(accessible_projects))
+            return keyset(query, DBTask.id, limit, after).all()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             raise internal_error
 
-    def fetch_from_project(self, project_id: int) -> List[DBTask]:
+    def fetch_from_project(self, project_id: int, limit: int = None,
+                           after: int = None, fields: Set[str] = None) -> List[DBTask]:
         try:
-            return self.session.query(DBTask).filter_by(project_id=project_id).all()
+            query = self._query_with_relations(fields).filter_by(project_id=project_id)
+            return keyset(query, DBTask.id, limit, after).all()
         except exc.SQLAlchemyError:
             raise internal_error
 
+    def fetch_from_sprint(self, sprint_id: int, fields: Set[str] = None) -> List[DBTask]:
+        try:
+            return self._query_with_relations(fields).filter_by(sprint_id=sprint_id).all()
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
+            raise internal_error
+
     def create(self, task_in: TaskCreate, creator_id: int) -> DBTask:
         new_task = DBTask(task_in, creator_id)
-        self.session.begin()
+        self.session.begin(subtransactions=True)
         self.session.add(new_task)
         try:
             self.session.commit()
-            self.session.refresh(new_task)
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
@@ -65,58 +96,240 @@ class TaskRepository(object):
         return new_task
 
     def delete(self, task: DBTask) -> None:
-        self.session.begin()
-        self.session.delete(task)
+        self.session.begin(subtransactions=True)
         try:
+            if task.sprint_id is not None:
+                burndown_repo = BurndownRepository(self.session)
+                burndown_repo.add_total(task.sprint_id, -(task.weight or 0))
+                if task.state == TaskState.done and task.done_date is not None:
+                    burndown_repo.add_done([(task.sprint_id, task.done_date, -(task.weight or 0))])
+                VersionRepository(self.session).bump_sprints([task.sprint_id])
+            self.session.delete(task)
             self.session.commit()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
             raise internal_error
 
-    def update(self, task: DBTask, tags: List[int] = None, **kwargs) -> DBTask:
-        self.session.begin()
-        for attr, value in kwargs.items():
-            if attr != 'id':
-                setattr(task, attr, value)
-        if tags is not None:
-            for tag in task.tags:
-                if tag.id not in tags:
-                    task.tags.remove(tag)
-                else:
-                    tags.remove(tag.id)
-            for tag_id in tags:
-                tag: DBTag = self.session.query(DBTag).get(tag_id)
-                if tag is not None:
-                    task.tags.append(tag)
+    def update(self, task_id: int, values: Dict[str, Any], tags: List[int] = None,
+               project_ids: Optional[List[int]] = None) -> Optional[int]:
+        """
+        Update task's columns with a single UPDATE ... RETURNING, the task isn't loaded.
+        The sprint's burndown snapshot is updated with the change of the task's weight
+        :param task_id: task's id
+        :param values: task's column names and their new values
+        :param tags: ids of the task's tags, None to keep them
+        :param project_ids: ids of the projects, which the task can belong to, None for any project
+        :return: the task's project id, None if there's no such task in the projects
+        """
+        tasks = DBTask.__table__
+        # the old weight is read and locked by the same statement
+        old = select([tasks.c.id, tasks.c.weight]).where(tasks.c.id == task_id).with_for_update().alias('old')
+        query = tasks.update().where(tasks.c.id == old.c.id)
+        if project_ids is not None:
+            query = query.where(tasks.c.project_id.in_(project_ids))
+        query = query.values(values).returning(tasks.c.project_id, tasks.c.sprint_id, tasks.c.state,
+                                               tasks.c.done_date, tasks.c.weight,
+                                               old.c.weight.label('old_weight'))
+        self.session.begin(subtransactions=True)
         try:
+            updated = self.session.execute(query).first()
+            if updated is not None:
+                weight_delta = (updated.weight or 0) - (updated.old_weight or 0)
+                if updated.sprint_id is not None and weight_delta:
+                    burndown_repo = BurndownRepository(self.session)
+                    burndown_repo.add_total(updated.sprint_id, weight_delta)
+                    if updated.state == TaskState.done and updated.done_date is not None:
+                        burndown_repo.add_done([(updated.sprint_id, updated.done_date, weight_delta)])
+                if tags is not None:
+                    self._sync_tags(task_id, updated.project_id, tags)
+                VersionRepository(self.session).bump_sprints([updated.sprint_id])
             self.session.commit()
-            self.session.refresh(task)
-            return task
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
             raise internal_error
+        return None if updated is None else updated.project_id
+
+    def assign(self, task_id: int, assignee_id: int, project_ids: Optional[List[int]] = None) -> Optional[int]:
+        """
+        Set task's assignee with a single UPDATE ... RETURNING, the task isn't loaded
+        :param task_id: task's id
+        :param assignee_id: user's id
+        :param project_ids: ids of the projects, which the task can belong to, None for any project
+        :return: the task's project id, None if there's no such task in the projects
+        """
+        tasks = DBTask.__table__
+        query = tasks.update().where(tasks.c.id == task_id)
+        if project_ids is not None:
+            query = query.where(tasks.c.project_id.in_(project_ids))
+        self.session.begin(subtransactions=True)
+        try:
+            assigned = self.session.execute(query.values(assignee_id=assignee_id)
+                                            .returning(tasks.c.project_id, tasks.c.sprint_id)).first()
+            if assigned is not None:
+                VersionRepository(self.session).bump_sprints([assigned.sprint_id])
+            self.session.commit()
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
+            self.session.rollback()
+            raise internal_error
+        return None if assigned is None else assigned.project_id
+
+    def _sync_tags(self, task_id: int, project_id: int, tag_ids: List[int]) -> None:
+        """
+        Replace task's tags with the requested ones, tags of other projects and missing tags
+        are ignored. Takes one SELECT, one DELETE and one INSERT, must be called inside of a transaction
+        """
+        tag_ids = set(tag_ids)
+        if tag_ids:
+            tag_ids = {row.id for row in self.session.query(DBTag.id)
+                       .filter(DBTag.id.in_(tag_ids), DBTag.project_id == project_id)}
+        delete = tags_association.delete().where(tags_association.c.task_id == task_id)
+        if tag_ids:
+            delete = delete.where(tags_association.c.tag_id.notin_(tag_ids))
+        self.session.execute(delete)
+        if tag_ids:
+            self.session.execute(
+                insert(tags_association)
+                .values([{'task_id': task_id, 'tag_id': tag_id} for tag_id in tag_ids])
+                .on_conflict_do_nothing()
+            )
+
+    def fetch_placement(self, task_ids: List[int]) -> Dict[int, Tuple[int, Optional[int]]]:
+        """
+        Fetch project's and sprint's ids of the tasks in a single query
+        :param task_ids: ids of the tasks
+        :return: a map of task's id to its project's and sprint's ids, missing tasks are omitted
+        """
+        if not task_ids:
+            return {}
+        try:
+            rows = self.session.query(DBTask.id, DBTask.project_id, DBTask.sprint_id)\
+                .filter(DBTask.id.in_(task_ids)).all()
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
+            raise internal_error
+        return {task_id: (project_id, sprint_id) for task_id, project_id, sprint_id in rows}
 
     def update_board(self, board: TaskBoard) -> None:
+        """
+        Move the board's tasks to their columns with a single UPDATE.
+        A task's done_date is set when it gets done and cleared when it leaves the done column,
+        the sprint's burndown snapshot is updated with the weight of the moved tasks
+        """
+        columns = {
+            TaskState.todo: _task_ids(board.todo),
+            TaskState.in_process: _task_ids(board.inProcess),
+            TaskState.testing: _task_ids(board.testing),
+            TaskState.done: _task_ids(board.done),
+        }
+        task_ids = [task_id for ids in columns.values() for task_id in ids]
+        if not task_ids:
+            return
+        today = dt.date.today()
+        state = case([(DBTask.id.in_(ids), literal(state, DBTask.state.type))
+                      for state, ids in columns.items() if ids],
+                     else_=DBTask.state)
+        was_done = DBTask.state == TaskState.done
+        becomes_done = DBTask.id.in_(columns[TaskState.done]) if columns[TaskState.done] else false()
+        done_date = case([(and_(was_done, not_(becomes_done)), null()),
+                          (and_(or_(DBTask.state.is_(None), not_(was_done)), becomes_done),
+                           today)],
+                         else_=DBTask.done_date)
+        done_ids = set(columns[TaskState.done])
         try:
-            self.session.begin()
-            self._update_state(board.todo, TaskState.todo)
-            self._update_state(board.inProcess, TaskState.in_process)
-            self._update_state(board.testing, TaskState.testing)
-            self._update_state(board.done, TaskState.done)
+            self.session.begin(subtransactions=True)
+            old_rows = self.session.query(DBTask.id, DBTask.sprint_id, DBTask.weight,
+                                          DBTask.state, DBTask.done_date)\
+                .filter(DBTask.id.in_(task_ids)).all()
+            self.session.query(DBTask).filter(DBTask.id.in_(task_ids))\
+                .update({DBTask.state: state, DBTask.done_date: done_date},
+                        synchronize_session=False)
+            deltas = []
+            for row in old_rows:
+                if row.sprint_id is None:
+                    continue
+                done_before = row.state == TaskState.done
+                if done_before and row.id not in done_ids and row.done_date is not None:
+                    deltas.append((row.sprint_id, row.done_date, -(row.weight or 0)))
+                elif not done_before and row.id in done_ids:
+                    deltas.append((row.sprint_id, today, row.weight or 0))
+            BurndownRepository(self.session).add_done(deltas)
+            VersionRepository(self.session).bump_sprints(row.sprint_id for row in old_rows)
             self.session.commit()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             self.session.rollback()
             raise internal_error
 
-    def _update_state(self, tasks: List[Task], state: TaskState):
-        for task in tasks:
-            task_db: DBTask = self.fetch(task.id)
-            if task_db.state != state:
-                if task_db.state == TaskState.done:
-                    task_db.done_date = None
-                elif state == TaskState.done:
-                    task_db.done_date = dt.date.today()
-                task_db.state = state
+
+class TaskRowRepository(object):
+    """
+    Reads tasks with Core selects into TaskRow, the tasks aren't tracked by the session.
+    Creator and assignee are joined to the tasks, tags are read with a second SELECT
+    """
+    tasks = DBTask.__table__
+    creator = DBUser.__table__.alias('creator')
+    assignee = DBUser.__table__.alias('assignee')
+    # the columns are in the order of TaskRow's and UserRow's arguments
+    task_columns = [tasks.c.id, tasks.c.name, tasks.c.description, tasks.c.project_id,
+                    tasks.c.priority, tasks.c.weight, tasks.c.created_at, tasks.c.sprint_id,
+                    tasks.c.creator_id, tasks.c.assignee_id, tasks.c.state]
+    user_columns = ['id', 'username', 'full_name', 'is_active', 'is_superuser']
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def fetch_all(self, project_ids: List[int] = None, sprint_id: int = None,
+                  limit: int = None, after: int = None) -> List[TaskRow]:
+        """
+        :param project_ids: ids of the projects, None for the tasks of all projects
+        :param sprint_id: id of the sprint, None for the tasks of all sprints
+        """
+        query = self._select()
+        if project_ids is not None:
+            query = query.where(self.tasks.c.project_id.in_(project_ids))
+        if sprint_id is not None:
+            query = query.where(self.tasks.c.sprint_id == sprint_id)
+        return self._fetch(keyset(query, self.tasks.c.id, limit, after))
+
+    def fetch(self, task_id: int) -> Optional[TaskRow]:
+        tasks = self._fetch(self._select().where(self.tasks.c.id == task_id))
+        return tasks[0] if tasks else None
+
+    def _select(self):
+        columns = (self.task_columns +
+                   [self.creator.c[name] for name in self.user_columns] +
+                   [self.assignee.c[name] for name in self.user_columns])
+        joined = self.tasks.join(self.creator, self.creator.c.id == self.tasks.c.creator_id)\
+            .outerjoin(self.assignee, self.assignee.c.id == self.tasks.c.assignee_id)
+        return select(columns).select_from(joined)
+
+    def _fetch(self, query) -> List[TaskRow]:
+        task_end = len(self.task_columns)
+        creator_end = task_end + len(self.user_columns)
+        try:
+            tasks = []
+            for row in self.session.execute(query):
+                assignee = UserRow(*row[creator_end:]) if row[creator_end] is not None else None
+                tasks.append(TaskRow(*row[:task_end], creator=UserRow(*row[task_end:creator_end]),
+                                     assignee=assignee))
+            if tasks:
+                self._fetch_tags(tasks)
+            return tasks
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
+            raise internal_error
+
+    def _fetch_tags(self, tasks: List[TaskRow]) -> None:
+        by_id = {task.id: task for task in tasks}
+        query = select([tags_association.c.task_id] + tag_columns)\
+            .select_from(tags_association.join(DBTag.__table__))\
+            .where(tags_association.c.task_id.in_(list(by_id)))
+        for row in self.session.execute(query):
+            by_id[row[0]].tags.append(TagRow(*row[1:]))
+
+
+def _task_ids(tasks: List[Task]) -> List[int]:
+    return [task.id for task in tasks]
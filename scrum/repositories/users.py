@@ -1,46 +1,56 @@
 import logging
-from typing import List, Optional, Tuple
+from typing import List, Mapping, Optional, Tuple
 
+from databases import Database
 from fastapi import HTTPException
-from sqlalchemy import exc
-from sqlalchemy.orm import Session
+from sqlalchemy import exc, event, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
-from scrum.core.security import get_password_hash
+from scrum.core import config
+from scrum.core.cache import TTLCache
+from scrum.db.async_session import database_errors
+from scrum.db.unit_of_work import on_commit
 from scrum.db_models.accessible_project import AccessibleProject, Roles
 from scrum.db_models.user import User as DBUser
-from scrum.models.users import UserAuth
+from scrum.repositories.pagination import keyset
 
 commit_exception = HTTPException(
     status_code=HTTP_500_INTERNAL_SERVER_ERROR,
     detail='Произошла внутренняя ошибка'
 )
 logger = logging.getLogger(__name__)
+# user's id -> user's column values, shared between requests
+user_cache = TTLCache(config.USER_CACHE_SIZE, config.USER_CACHE_TTL)
+
+
+def invalidate_user(user_id: int) -> None:
+    user_cache.invalidate(user_id)
+
+
+@event.listens_for(DBUser, 'after_update')
+@event.listens_for(DBUser, 'after_delete')
+def _invalidate_changed_user(mapper, connection, target: DBUser) -> None:
+    on_commit(object_session(target), invalidate_user, target.id)
+
+
+@event.listens_for(DBUser, 'before_update')
+def _bump_access_version(mapper, connection, target: DBUser) -> None:
+    """
+    Tokens carry the user's flags, so a change of them makes the tokens stale
+    """
+    state = inspect(target)
+    if state.attrs.is_active.history.has_changes() or state.attrs.is_superuser.history.has_changes():
+        target.access_version = DBUser.access_version + 1
 
 
 class UserRepository(object):
     def __init__(self, session: Session):
         self.session = session
 
-    def create_user(self, user_in: UserAuth) -> DBUser:
-        user = DBUser(
-            username=user_in.username,
-            hashed_password=get_password_hash(user_in.password)
-        )
-        self.session.begin()
-        self.session.add(user)
-        try:
-            self.session.commit()
-            self.session.refresh(user)
-        except exc.SQLAlchemyError as e:
-            logger.error(e)
-            self.session.rollback()
-            raise commit_exception
-        return user
-
-    def fetch_all(self) -> List[DBUser]:
+    def fetch_all(self, limit: int = None, after: int = None) -> List[DBUser]:
         try:
-            return self.session.query(DBUser).all()
+            return keyset(self.session.query(DBUser), DBUser.id, limit, after).all()
         except exc.SQLAlchemyError as e:
             logger.error(e)
             raise commit_exception
@@ -81,6 +91,24 @@ class UserRepository(object):
             logger.error(e)
             raise commit_exception
 
+    def fetch_cached(self, user_id: int) -> Optional[DBUser]:
+        """
+        Fetch user object by its id, using the cache shared between requests.
+        A cached user is attached to the session without querying the database
+        :param user_id: user's id
+        :return: user's object or None
+        """
+        values = user_cache.get(user_id)
+        if values is None:
+            user = self.fetch(user_id)
+            if user is not None:
+                user_cache.set(user_id, {attr.key: getattr(user, attr.key)
+                                         for attr in inspect(DBUser).column_attrs})
+            return user
+        user = DBUser(**values)
+        make_transient_to_detached(user)
+        return self.session.merge(user, load=False)
+
     def fetch_by_username(self, username: str) -> Optional[DBUser]:
         """
         Fetch a user object by its username
@@ -90,3 +118,58 @@ class UserRepository(object):
         except exc.SQLAlchemyError as e:
             logger.error(e)
             raise commit_exception
+
+
+users = DBUser.__table__
+# columns of a user without the password's hash
+user_columns = [users.c.id, users.c.username, users.c.full_name, users.c.is_active, users.c.is_superuser]
+
+
+class AsyncUserRepository(object):
+    def __init__(self, database: Database):
+        self.database = database
+
+    async def fetch(self, user_id: int) -> Optional[Mapping]:
+        """
+        Fetch a user's row with the access version by its id
+        """
+        try:
+            return await self.database.fetch_one(select(user_columns + [users.c.access_version])
+                                                 .where(users.c.id == user_id))
+        except database_errors as e:
+            logger.error(e)
+            raise commit_exception
+
+    async def fetch_by_username(self, username: str) -> Optional[Mapping]:
+        """
+        Fetch a user's row with the password's hash and the access version by its username
+        """
+        query = select(user_columns + [users.c.hashed_password, users.c.access_version])
+        try:
+            return await self.database.fetch_one(query.where(users.c.username == username))
+        except database_errors as e:
+            logger.error(e)
+            raise commit_exception
+
+    async def create(self, username: str, hashed_password: str) -> Mapping:
+        """
+        Insert a user, the column defaults aren't applied by the async layer, so they are explicit
+        :return: the new user's row without the password's hash
+        """
+        query = users.insert().values(username=username, hashed_password=hashed_password,
+                                      is_active=True, is_superuser=False,
+                                      access_version=1).returning(*user_columns)
+        try:
+            return await self.database.fetch_one(query)
+        except database_errors as e:
+            logger.error(e)
+            raise commit_exception
+
+    async def update_password_hash(self, user_id: int, hashed_password: str) -> None:
+        try:
+            await self.database.execute(users.update().where(users.c.id == user_id)
+                                        .values(hashed_password=hashed_password))
+        except database_errors as e:
+            logger.error(e)
+            raise commit_exception
+        invalidate_user(user_id)
@@ -0,0 +1,93 @@
+import logging
+from typing import Iterable, List, Optional, Tuple
+
+from databases import Database
+from fastapi import HTTPException
+from sqlalchemy import exc, select
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
+
+from scrum.db.async_session import database_errors
+from scrum.db_models.project import Project as DBProject
+from scrum.db_models.sprint import Sprint as DBSprint
+from scrum.db_models.user import User as DBUser
+
+internal_error = HTTPException(
+    status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+    detail='Внутренняя ошибка сервера'
+)
+logger = logging.getLogger(__name__)
+
+projects = DBProject.__table__
+sprints = DBSprint.__table__
+users = DBUser.__table__
+
+
+def _projects_versions_query(project_ids: Optional[List[int]]):
+    query = select([projects.c.id, projects.c.version]).order_by(projects.c.id)
+    if project_ids is not None:
+        query = query.where(projects.c.id.in_(project_ids))
+    return query
+
+
+class VersionRepository(object):
+    """
+    Version counters of projects and sprints, ETags of the read endpoints are derived from them.
+    A project's version is bumped when the project or its tags change,
+    a sprint's version is bumped when its tasks change.
+    Users' access versions are bumped when their project roles change, they stamp the tokens
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def bump_project(self, project_id: int) -> None:
+        """
+        Must be called inside of a transaction
+        """
+        self.session.execute(projects.update().where(projects.c.id == project_id)
+                             .values(version=projects.c.version + 1))
+
+    def bump_sprints(self, sprint_ids: Iterable[Optional[int]]) -> None:
+        """
+        Must be called inside of a transaction
+        :param sprint_ids: ids of the sprints, None values are skipped
+        """
+        sprint_ids = {sprint_id for sprint_id in sprint_ids if sprint_id is not None}
+        if sprint_ids:
+            self.session.execute(sprints.update().where(sprints.c.id.in_(sprint_ids))
+                                 .values(version=sprints.c.version + 1))
+
+    def bump_users(self, user_ids: Iterable[int]) -> None:
+        """
+        Must be called inside of a transaction, the users' cached roles and values
+        must be invalidated after the commit
+        """
+        user_ids = set(user_ids)
+        if user_ids:
+            self.session.execute(users.update().where(users.c.id.in_(user_ids))
+                                 .values(access_version=users.c.access_version + 1))
+
+    def fetch_projects(self, project_ids: Optional[List[int]]) -> List[Tuple[int, int]]:
+        """
+        :param project_ids: ids of the projects, None for all projects
+        :return: ids and versions of the existing projects ordered by id
+        """
+        try:
+            return [tuple(row) for row in self.session.execute(_projects_versions_query(project_ids))]
+        except exc.SQLAlchemyError as e:
+            logger.error(e)
+            raise internal_error
+
+
+class AsyncVersionRepository(object):
+    def __init__(self, database: Database):
+        self.database = database
+
+    async def fetch_projects(self, project_ids: Optional[List[int]]) -> List[Tuple[int, int]]:
+        try:
+            rows = await self.database.fetch_all(_projects_versions_query(project_ids))
+        except database_errors as e:
+            logger.error(e)
+            raise internal_error
+        return [(row['id'], row['version']) for row in rows]
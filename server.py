@@ -1,21 +1,45 @@
 import uvicorn
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 
+from scrum.api.utils.db import release_db
 from scrum.api.v1.api import api_router
 from scrum.core.config import API_V1_PREFIX
-from scrum.db.session import Session
+from scrum.core.security import password_hasher
+from scrum.db.async_session import database
 
 app = FastAPI(title='Scrum')
 
 app.include_router(api_router, prefix=API_V1_PREFIX)
 
 
+@app.on_event('startup')
+async def connect_database():
+    await database.connect()
+
+
+@app.on_event('shutdown')
+async def disconnect_database():
+    await database.disconnect()
+
+
+@app.on_event('shutdown')
+def stop_password_hasher():
+    password_hasher.shutdown()
+
+
 @app.middleware('http')
 async def session_middleware(request, call_next):
-    request.state.session = Session()
-    response = await call_next(request)
-    request.state.session.close()
-    return response
+    # the state must exist before call_next, so the endpoint shares it with the middleware
+    request.state.session = None
+    response = None
+    try:
+        response = await call_next(request)
+        return response
+    finally:
+        if request.state.session is not None:
+            # the unit of work is committed only for a successful response, off the event loop
+            await run_in_threadpool(release_db, request, response is not None and response.status_code < 400)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from typing import Callable, Dict
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.testclient import TestClient
+
+import server
+from scrum.api.utils import db
+from scrum.api.utils.security import token_cache
+from scrum.core.jwt import create_access_token
+from scrum.db.base import Base
+from scrum.repositories.accessible_project import role_cache
+from scrum.repositories.sprints import ongoing_cache
+from scrum.repositories.users import user_cache
+
+
+class StatementCounter(object):
+    """
+    Counts statements executed by the engine
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+@pytest.fixture
+def engine():
+    # a single in-memory database shared by all sessions of a test
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    # configured like the request sessions
+    return sessionmaker(autocommit=True, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+@pytest.fixture
+def statements(engine):
+    counter = StatementCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    yield counter
+    event.remove(engine, 'before_cursor_execute', counter)
+
+
+@pytest.fixture
+def client(session_factory, monkeypatch):
+    """
+    A client of the app, which opens the request sessions on the test's database
+    """
+    monkeypatch.setattr(db, 'SessionFactory', session_factory)
+    # the caches are shared between requests and the ids are reused by every test's database
+    for cache in (token_cache, role_cache, ongoing_cache, user_cache):
+        cache.clear()
+    return TestClient(server.app)
+
+
+@pytest.fixture
+def auth_headers() -> Callable[[int], Dict[str, str]]:
+    def headers(user_id: int) -> Dict[str, str]:
+        token = create_access_token(data={'user_id': user_id}, expires_delta=timedelta(minutes=5))
+        return {'Authorization': f'Bearer {token.decode()}'}
+
+    return headers
@@ -0,0 +1,64 @@
+from scrum.core import config
+from scrum.db_models.project import Project
+from scrum.db_models.task import Task
+from scrum.db_models.user import User
+from scrum.models.task import TaskCreate
+
+TASK_COUNT = config.DEFAULT_PAGE_SIZE + 50
+
+
+def add_tasks(session_factory) -> None:
+    """
+    Add a superuser with the id 1 and the project's owner with the id 2,
+    who owns a project with more tasks than fit a page
+    """
+    session = session_factory()
+    with session.begin():
+        session.add(User(username='admin', hashed_password='-', is_superuser=True))
+        owner = User(username='owner', hashed_password='-')
+        session.add(owner)
+        session.flush()
+        project = Project(owner.id, name='project', sprint_length=2)
+        session.add(project)
+        session.flush()
+        session.add_all([Task(TaskCreate(name=f'task{n}', project_id=project.id, priority=0, weight=1), owner.id)
+                         for n in range(TASK_COUNT)])
+
+
+def read_pages(client, headers, url: str) -> list:
+    """
+    Read the list following the cursors of the next pages
+    """
+    items = []
+    response = client.get(url, headers=headers)
+    while True:
+        assert response.status_code == 200
+        items.extend(response.json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            return items
+        response = client.get(url, headers=headers, params={'cursor': cursor})
+
+
+def test_all_tasks_are_paginated_by_default(session_factory, client, auth_headers):
+    add_tasks(session_factory)
+    response = client.get('/api/v1/tasks', headers=auth_headers(1))
+    assert len(response.json()) == config.DEFAULT_PAGE_SIZE
+    assert 'X-Next-Cursor' in response.headers
+    tasks = read_pages(client, auth_headers(1), '/api/v1/tasks')
+    assert sorted(task['id'] for task in tasks) == list(range(1, TASK_COUNT + 1))
+
+
+def test_tasks_of_user_projects_are_complete_without_cursor(session_factory, client, auth_headers):
+    add_tasks(session_factory)
+    for url in ('/api/v1/tasks', '/api/v1/tasks?project_id=1'):
+        response = client.get(url, headers=auth_headers(2))
+        assert response.status_code == 200
+        assert len(response.json()) == TASK_COUNT
+        assert 'X-Next-Cursor' not in response.headers
+
+
+def test_requested_pages_cover_the_list(session_factory, client, auth_headers):
+    add_tasks(session_factory)
+    tasks = read_pages(client, auth_headers(2), '/api/v1/tasks?limit=40')
+    assert sorted(task['id'] for task in tasks) == list(range(1, TASK_COUNT + 1))
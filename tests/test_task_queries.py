@@ -0,0 +1,69 @@
+import itertools
+
+import pytest
+
+from scrum.api.utils.tasks import tasks_response
+from scrum.db_models.project import Project
+from scrum.db_models.tag import Tag
+from scrum.db_models.task import Task
+from scrum.db_models.user import User
+from scrum.models.task import TaskCreate
+from scrum.repositories.tasks import TaskRepository
+
+FETCHES = {
+    'fetch_all': lambda task_repo, project_id: task_repo.fetch_all(),
+    'fetch_accessible': lambda task_repo, project_id: task_repo.fetch_accessible([project_id]),
+    'fetch_from_project': lambda task_repo, project_id: task_repo.fetch_from_project(project_id),
+}
+user_numbers = itertools.count()
+
+
+def add_project(session_factory) -> int:
+    session = session_factory()
+    with session.begin():
+        owner = User(username='owner', hashed_password='-')
+        session.add(owner)
+        session.flush()
+        project = Project(owner.id, name='project', sprint_length=2)
+        session.add(project)
+    return project.id
+
+
+def add_tasks(session_factory, project_id: int, count: int) -> None:
+    """
+    Add tasks with their own creators, assignees and tags, so every lazy load would be a query
+    """
+    session = session_factory()
+    with session.begin():
+        for _ in range(count):
+            creator = User(username=f'creator{next(user_numbers)}', hashed_password='-')
+            assignee = User(username=f'assignee{next(user_numbers)}', hashed_password='-')
+            tag = Tag(name='tag', project_id=project_id)
+            session.add_all([creator, assignee, tag])
+            session.flush()
+            task = Task(TaskCreate(name='task', project_id=project_id, priority=0, weight=1), creator.id)
+            task.assignee_id = assignee.id
+            task.tags.append(tag)
+            session.add(task)
+
+
+def count_serialization(session_factory, statements, fetch, project_id: int) -> int:
+    """
+    Fetch the tasks with a new session and serialize them
+    :return: number of executed statements
+    """
+    task_repo = TaskRepository(session_factory())
+    statements.count = 0
+    tasks = tasks_response(fetch(task_repo, project_id))
+    assert all(task.assignee is not None and task.tags for task in tasks)
+    return statements.count
+
+
+@pytest.mark.parametrize('fetch', FETCHES.values(), ids=list(FETCHES))
+def test_task_list_query_count_is_constant(session_factory, statements, fetch):
+    project_id = add_project(session_factory)
+    add_tasks(session_factory, project_id, 2)
+    few = count_serialization(session_factory, statements, fetch, project_id)
+    add_tasks(session_factory, project_id, 40)
+    many = count_serialization(session_factory, statements, fetch, project_id)
+    assert few == many
@@ -0,0 +1,59 @@
+from typing import Any, Dict, List, Optional
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from scrum.api.utils import db
+from scrum.db_models.user import User
+
+
+class CompiledDatabase(object):
+    """
+    Stands in for the async database: statements are compiled for Postgres and their parameters
+    are taken from the compiled statement like the databases package takes them, then they are run
+    on the test's SQLite database. Column defaults aren't applied, as by the async layer
+    """
+    dialect = postgresql.dialect(paramstyle='named')
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def fetch_all(self, query) -> List[Dict[str, Any]]:
+        compiled = query.compile(dialect=self.dialect)
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(str(compiled), compiled.params)
+            names = [column[0] for column in cursor.description or []]
+            rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+            connection.commit()
+            return rows
+        finally:
+            connection.close()
+
+    async def fetch_one(self, query) -> Optional[Dict[str, Any]]:
+        rows = await self.fetch_all(query)
+        return rows[0] if rows else None
+
+    async def execute(self, query) -> None:
+        await self.fetch_all(query)
+
+
+@pytest.fixture
+def database(engine, monkeypatch):
+    database = CompiledDatabase(engine)
+    monkeypatch.setattr(db, 'database', database)
+    return database
+
+
+def test_create_user(client, database, session_factory):
+    response = client.post('/api/v1/users', json={'username': 'new', 'password': 'secret'})
+    assert response.status_code == 200
+    assert response.json()['username'] == 'new'
+    user = session_factory().query(User).filter_by(username='new').one()
+    assert (user.is_active, user.is_superuser, user.access_version) == (True, False, 1)
+
+
+def test_create_existing_user(client, database):
+    assert client.post('/api/v1/users', json={'username': 'new', 'password': 'secret'}).status_code == 200
+    assert client.post('/api/v1/users', json={'username': 'new', 'password': 'other'}).status_code == 400